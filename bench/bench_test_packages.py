@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# Build-performance benchmark based on `test_package*` projects.
+#
+# For each variant (linker, libc++ vs libstdc++, sanitizers, shared vs static llvm libs)
+# measures cmake configure, compile, link and test-run (start-up) time.
+# Compile and link times are taken from `.ninja_log`, so Ninja is required.
+#
+# NOTE: `llvm_9_installer` and `llvm_9` packages (with options used by variants)
+# must be already available in conan cache, see README.
+#
+# USAGE
+# python3 bench/bench_test_packages.py --profile clang_libcpp --output bench.json
+# python3 bench/bench_test_packages.py --profile clang_libcpp --baseline bench.json --threshold 0.15
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def get_name(default):
+    envvar = os.getenv("LLVM_INSTALLER_PACKAGE_NAME", default)
+    return envvar
+
+# `options` are `llvm_9_installer` options,
+# `definitions` are passed to cmake same way as `test_package*/conanfile.py` does,
+# `run_args` are same as in `test()` of `test_package*/conanfile.py`.
+VARIANTS = [
+  {
+    "name": "libcxx",
+    "test_package": "test_package_libcpp",
+    "options": {"link_libcxx": "True"},
+    "definitions": {},
+    "run_args": []
+  },
+  {
+    "name": "libcxx-lld",
+    "test_package": "test_package_libcpp",
+    "options": {"link_libcxx": "True", "linker": "lld"},
+    "definitions": {},
+    "run_args": []
+  },
+  {
+    "name": "libstdcxx",
+    "test_package": "test_package_gcc",
+    "options": {"link_libcxx": "False"},
+    "definitions": {},
+    "run_args": []
+  },
+  {
+    "name": "libstdcxx-lld",
+    "test_package": "test_package_gcc",
+    "options": {"link_libcxx": "False", "linker": "lld"},
+    "definitions": {},
+    "run_args": []
+  },
+  {
+    "name": "sanitize-asan",
+    "test_package": "test_package_sanitize",
+    "options": {"link_libcxx": "True", "use_sanitizer": "Address;Undefined"},
+    "settings": {"compiler.sanitizer": "AddressUndefinedBehavior"},
+    "definitions": {},
+    "run_args": []
+  },
+  {
+    "name": "llvm-libs-static",
+    "test_package": "test_package",
+    "options": {"link_libcxx": "True", "link_with_llvm_libs": "True", "shared": "False"},
+    "definitions": {"LINKS_LIBCXX": "ON", "LINKS_LLVM_LIBS": "ON", "HAS_SANITIZERS": "OFF"},
+    "run_args": ["--version"]
+  },
+  {
+    "name": "llvm-libs-static-lld",
+    "test_package": "test_package",
+    "options": {"link_libcxx": "True", "link_with_llvm_libs": "True", "shared": "False", "linker": "lld"},
+    "definitions": {"LINKS_LIBCXX": "ON", "LINKS_LLVM_LIBS": "ON", "HAS_SANITIZERS": "OFF"},
+    "run_args": ["--version"]
+  },
+  {
+    "name": "llvm-libs-shared",
+    "test_package": "test_package",
+    "options": {"link_libcxx": "True", "link_with_llvm_libs": "True", "shared": "True"},
+    "definitions": {"LINKS_LIBCXX": "ON", "LINKS_LLVM_LIBS": "ON", "HAS_SANITIZERS": "OFF"},
+    "run_args": ["--version"]
+  }
+]
+
+# Metrics compared against baseline (lower is better)
+METRICS = ["configure_s", "compile_s", "link_s", "run_s"]
+
+def run_timed(command, cwd=None, env=None):
+    start = time.perf_counter()
+    process = subprocess.run(command, cwd=cwd, env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                             universal_newlines=True)
+    return time.perf_counter() - start, process
+
+def check(process, what):
+    if process.returncode != 0:
+        sys.stderr.write(process.stdout)
+        raise Exception("{} failed with code {}".format(what, process.returncode))
+
+def conan_install(args, variant, build_dir):
+    installer = get_name("llvm_9_installer")
+    llvm_pkg_name = variant["options"].get("LLVM_PKG_NAME", "llvm_9")
+    with open(os.path.join(build_dir, "conanfile.txt"), "w") as f:
+        f.write("[requires]\n{}\n\n[generators]\ncmake\ncmake_find_package\ncmake_paths\njson\n".format(
+            args.reference))
+    command = ["conan", "install", build_dir, "--install-folder", build_dir]
+    if args.profile:
+        command.extend(["--profile", args.profile])
+    for key, value in sorted(variant["options"].items()):
+        # llvm libs related options are forwarded to `llvm_9` by `llvm_9_installer`
+        command.extend(["-o", "{}:{}={}".format(installer, key, value)])
+    for key, value in sorted(variant.get("settings", {}).items()):
+        command.extend(["-s", "{}={}".format(key, value)])
+    _, process = run_timed(command)
+    check(process, "conan install")
+    return llvm_pkg_name
+
+# Environment of `llvm_9_installer` i.e. CC, CXX, LD_PRELOAD, etc.
+def conan_environment(build_dir):
+    with open(os.path.join(build_dir, "conanbuildinfo.json"), "r") as f:
+        info = json.load(f)
+    env = dict(os.environ)
+    for key, value in info.get("deps_env_info", {}).items():
+        if isinstance(value, list):
+            previous = [env[key]] if env.get(key) else []
+            env[key] = os.pathsep.join(value + previous)
+        else:
+            env[key] = value
+    return env
+
+# Splits build time into compile (objects) and link (everything else)
+def parse_ninja_log(build_dir):
+    compile_ms = 0
+    link_ms = 0
+    with open(os.path.join(build_dir, ".ninja_log"), "r") as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 4:
+                continue
+            duration = int(fields[1]) - int(fields[0])
+            if re.search(r"\.(o|obj)$", fields[3]):
+                compile_ms += duration
+            else:
+                link_ms += duration
+    return compile_ms / 1000.0, link_ms / 1000.0
+
+def bench_variant(args, variant):
+    build_dir = os.path.join(os.path.abspath(args.build_dir), variant["name"])
+    if os.path.exists(build_dir):
+        shutil.rmtree(build_dir)
+    os.makedirs(build_dir)
+
+    llvm_pkg_name = conan_install(args, variant, build_dir)
+    env = conan_environment(build_dir)
+
+    definitions = dict(variant["definitions"])
+    definitions["LLVM_PACKAGE_NAME"] = llvm_pkg_name
+    definitions["CMAKE_BUILD_TYPE"] = args.build_type
+    command = ["cmake", "-G", "Ninja", os.path.join(ROOT_DIR, variant["test_package"])]
+    command.extend("-D{}={}".format(key, value) for key, value in sorted(definitions.items()))
+    configure_s, process = run_timed(command, cwd=build_dir, env=env)
+    check(process, "cmake configure")
+
+    build_s, process = run_timed(["cmake", "--build", "."], cwd=build_dir, env=env)
+    check(process, "cmake build")
+    compile_s, link_s = parse_ninja_log(build_dir)
+
+    binary = os.path.join(build_dir, "bin", "test_package")
+    runs = []
+    for _ in range(args.repeat):
+        run_s, process = run_timed([binary] + variant["run_args"], cwd=build_dir, env=env)
+        check(process, "test run")
+        runs.append(run_s)
+    runs.sort()
+
+    return {
+        "configure_s": configure_s,
+        "build_s": build_s,
+        "compile_s": compile_s,
+        "link_s": link_s,
+        # median of `--repeat` runs
+        "run_s": runs[len(runs) // 2],
+        "binary_size": os.path.getsize(binary)
+    }
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, metrics in sorted(results["variants"].items()):
+        base = baseline.get("variants", {}).get(name)
+        if not base:
+            continue
+        for metric in METRICS:
+            if metric not in metrics or not base.get(metric):
+                continue
+            ratio = metrics[metric] / base[metric]
+            if ratio > 1.0 + threshold:
+                regressions.append("{}: {} {:.3f}s -> {:.3f}s (+{:.0f}%)".format(
+                    name, metric, base[metric], metrics[metric], (ratio - 1.0) * 100))
+    return regressions
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmarks build latency of test_package* projects")
+    parser.add_argument("--reference", default="{}/master@conan/stable".format(get_name("llvm_9_installer")))
+    parser.add_argument("--profile", default=None)
+    parser.add_argument("--build-type", default="Release")
+    parser.add_argument("--build-dir", default="bench_build")
+    parser.add_argument("--variants", default=None, help="regex to filter variants by name")
+    parser.add_argument("--repeat", type=int, default=5, help="test-run repeats")
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--baseline", default=None, help="results of previous run")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="allowed slowdown relative to baseline i.e. 0.1 means 10%%")
+    args = parser.parse_args(argv)
+
+    if not shutil.which("ninja"):
+        raise Exception("Unable to find ninja in PATH")
+
+    results = {
+        "reference": args.reference,
+        "profile": args.profile,
+        "host": platform.node(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "variants": {}
+    }
+    failed = []
+    for variant in VARIANTS:
+        if args.variants and not re.search(args.variants, variant["name"]):
+            continue
+        sys.stderr.write("benchmarking {}\n".format(variant["name"]))
+        try:
+            results["variants"][variant["name"]] = bench_variant(args, variant)
+        except Exception as e:
+            sys.stderr.write("{}: {}\n".format(variant["name"], str(e)))
+            failed.append(variant["name"])
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+    for name, metrics in sorted(results["variants"].items()):
+        sys.stdout.write("{:<24} configure {:>7.2f}s compile {:>7.2f}s link {:>7.2f}s run {:>7.3f}s\n".format(
+            name, metrics["configure_s"], metrics["compile_s"], metrics["link_s"], metrics["run_s"]))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            sys.stdout.write("REGRESSION {}\n".format(regression))
+
+    return 1 if (failed or regressions) else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
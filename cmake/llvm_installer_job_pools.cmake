@@ -0,0 +1,75 @@
+# Ninja job pools sized from available cores and memory,
+# prevents OOM when many link jobs (i.e. linking with all LLVM libs) run at once.
+# Included by conan if `llvm_9_installer:job_pools=True`
+#
+# LLVM_INSTALLER_LINK_JOB_MEMORY_MB - expected memory usage of one link job,
+# env. var. is set by llvm_9_installer based on `linker` and `consumer_lto` options.
+# LLVM_INSTALLER_COMPILE_JOB_MEMORY_MB - expected memory usage of one compile job.
+# Both can be overridden by cmake cache variables with same names.
+# LLVM_INSTALLER_COMPILE_JOBS - size of compile pool (not limited by local cores),
+# env. var. is set by llvm_9_installer if `distributed_jobs` option is set.
+#
+# NOTE: job pools are supported only by Ninja generator,
+# pools are not used if CMAKE_JOB_POOL_LINK or CMAKE_JOB_POOL_COMPILE already set.
+
+# may be included multiple times by different conan generators
+get_property(LLVM_INSTALLER_JOB_POOLS_DEFINED GLOBAL PROPERTY LLVM_INSTALLER_JOB_POOLS_DEFINED)
+if(LLVM_INSTALLER_JOB_POOLS_DEFINED)
+  return()
+endif()
+set_property(GLOBAL PROPERTY LLVM_INSTALLER_JOB_POOLS_DEFINED TRUE)
+
+if(NOT DEFINED LLVM_INSTALLER_LINK_JOB_MEMORY_MB)
+  if(DEFINED ENV{LLVM_INSTALLER_LINK_JOB_MEMORY_MB})
+    set(LLVM_INSTALLER_LINK_JOB_MEMORY_MB_DEFAULT $ENV{LLVM_INSTALLER_LINK_JOB_MEMORY_MB})
+  else()
+    set(LLVM_INSTALLER_LINK_JOB_MEMORY_MB_DEFAULT 4096)
+  endif()
+  set(LLVM_INSTALLER_LINK_JOB_MEMORY_MB ${LLVM_INSTALLER_LINK_JOB_MEMORY_MB_DEFAULT}
+    CACHE STRING "Expected memory usage of one link job (MB)")
+endif()
+
+if(NOT DEFINED LLVM_INSTALLER_COMPILE_JOB_MEMORY_MB)
+  set(LLVM_INSTALLER_COMPILE_JOB_MEMORY_MB 1024
+    CACHE STRING "Expected memory usage of one compile job (MB)")
+endif()
+
+cmake_host_system_information(RESULT LLVM_INSTALLER_CORES QUERY NUMBER_OF_LOGICAL_CORES)
+# NOTE: total (not available) memory, so configuration does not depend on current load
+cmake_host_system_information(RESULT LLVM_INSTALLER_MEMORY_MB QUERY TOTAL_PHYSICAL_MEMORY)
+
+math(EXPR LLVM_INSTALLER_LINK_JOBS "${LLVM_INSTALLER_MEMORY_MB} / ${LLVM_INSTALLER_LINK_JOB_MEMORY_MB}")
+math(EXPR LLVM_INSTALLER_COMPILE_JOBS "${LLVM_INSTALLER_MEMORY_MB} / ${LLVM_INSTALLER_COMPILE_JOB_MEMORY_MB}")
+
+if(DEFINED ENV{LLVM_INSTALLER_COMPILE_JOBS})
+  # distributed compilation (distcc, icecc) uses remote cores
+  set(LLVM_INSTALLER_COMPILE_JOBS_OVERRIDE $ENV{LLVM_INSTALLER_COMPILE_JOBS})
+endif()
+
+foreach(POOL LINK COMPILE)
+  if(LLVM_INSTALLER_${POOL}_JOBS GREATER LLVM_INSTALLER_CORES)
+    set(LLVM_INSTALLER_${POOL}_JOBS ${LLVM_INSTALLER_CORES})
+  endif()
+  if(LLVM_INSTALLER_${POOL}_JOBS LESS 1)
+    set(LLVM_INSTALLER_${POOL}_JOBS 1)
+  endif()
+endforeach()
+
+if(LLVM_INSTALLER_COMPILE_JOBS_OVERRIDE)
+  set(LLVM_INSTALLER_COMPILE_JOBS ${LLVM_INSTALLER_COMPILE_JOBS_OVERRIDE})
+endif()
+
+set_property(GLOBAL APPEND PROPERTY JOB_POOLS
+  llvm_installer_compile_pool=${LLVM_INSTALLER_COMPILE_JOBS}
+  llvm_installer_link_pool=${LLVM_INSTALLER_LINK_JOBS}
+)
+
+if(NOT CMAKE_JOB_POOL_COMPILE)
+  set(CMAKE_JOB_POOL_COMPILE llvm_installer_compile_pool)
+endif()
+
+if(NOT CMAKE_JOB_POOL_LINK)
+  set(CMAKE_JOB_POOL_LINK llvm_installer_link_pool)
+endif()
+
+message(STATUS "llvm_installer job pools: compile=${LLVM_INSTALLER_COMPILE_JOBS} link=${LLVM_INSTALLER_LINK_JOBS} (${LLVM_INSTALLER_CORES} cores, ${LLVM_INSTALLER_MEMORY_MB} MB)")
@@ -0,0 +1,72 @@
+# Precompiled header with heavy LLVM/Clang headers used by LibTooling based tools.
+# Included by conan if `llvm_9_installer:clang_headers_cache=pch`
+#
+# NOTE: PCH is built by consumer build with same flags as consumer target
+# (-std, -fno-rtti, defines, -stdlib=libc++, etc.),
+# so it always matches exported include dirs and libc++ flags.
+#
+# NOTE: requires CMake 3.16+
+#
+# Headers are added to `INTERFACE_PRECOMPILE_HEADERS` of `clang_headers` component target
+# (i.e. `llvm_9_installer::clang_headers` of `cmake_find_package`), so each target that links it
+# gets PCH automatically. Set `LLVM_INSTALLER_PCH_TARGET` to empty string to disable it.
+#
+# USAGE
+# target_link_libraries(my_tool PRIVATE llvm_9_installer::clang_headers)
+# # or without component target (i.e. `cmake` generator)
+# llvm_installer_target_precompile_headers(my_tool)
+# # reuse PCH of `my_tool` (targets must use same flags)
+# llvm_installer_target_precompile_headers(my_other_tool REUSE_FROM my_tool)
+
+set(LLVM_INSTALLER_PCH_HEADERS
+  <llvm/ADT/StringRef.h>
+  <llvm/Support/CommandLine.h>
+  <llvm/Support/raw_ostream.h>
+  <clang/AST/AST.h>
+  <clang/AST/ASTConsumer.h>
+  <clang/AST/ASTContext.h>
+  <clang/AST/RecursiveASTVisitor.h>
+  <clang/ASTMatchers/ASTMatchers.h>
+  <clang/ASTMatchers/ASTMatchFinder.h>
+  <clang/Basic/SourceManager.h>
+  <clang/Frontend/CompilerInstance.h>
+  <clang/Frontend/FrontendActions.h>
+  <clang/Lex/Lexer.h>
+  <clang/Rewrite/Core/Rewriter.h>
+  <clang/Sema/Sema.h>
+  <clang/Tooling/CommonOptionsParser.h>
+  <clang/Tooling/Tooling.h>
+  CACHE STRING "Headers precompiled by llvm_installer_target_precompile_headers")
+
+function(llvm_installer_target_precompile_headers TARGET)
+  cmake_parse_arguments(ARG "" "REUSE_FROM" "" ${ARGN})
+  if(CMAKE_VERSION VERSION_LESS 3.16)
+    message(WARNING "precompiled headers require CMake 3.16+, skipped for ${TARGET}")
+    return()
+  endif()
+  if(ARG_REUSE_FROM)
+    target_precompile_headers(${TARGET} REUSE_FROM ${ARG_REUSE_FROM})
+  else()
+    target_precompile_headers(${TARGET} PRIVATE ${LLVM_INSTALLER_PCH_HEADERS})
+  endif()
+endfunction()
+
+# `CMAKE_FIND_PACKAGE_NAME` is set while conan generated `Find<package>.cmake` includes this file
+if(CMAKE_FIND_PACKAGE_NAME)
+  set(LLVM_INSTALLER_PCH_TARGET "${CMAKE_FIND_PACKAGE_NAME}::clang_headers"
+    CACHE STRING "Component target that gets precompiled headers")
+endif()
+
+if(LLVM_INSTALLER_PCH_TARGET AND TARGET ${LLVM_INSTALLER_PCH_TARGET})
+  if(CMAKE_VERSION VERSION_LESS 3.16)
+    message(WARNING "precompiled headers require CMake 3.16+, skipped for ${LLVM_INSTALLER_PCH_TARGET}")
+  else()
+    # only C++ sources use LLVM/Clang headers,
+    # `>` of `<header>` must be escaped inside generator expression
+    foreach(_llvm_installer_pch_header ${LLVM_INSTALLER_PCH_HEADERS})
+      string(REPLACE ">" "$<ANGLE-R>" _llvm_installer_pch_header "${_llvm_installer_pch_header}")
+      set_property(TARGET ${LLVM_INSTALLER_PCH_TARGET} APPEND PROPERTY INTERFACE_PRECOMPILE_HEADERS
+        "$<$<COMPILE_LANGUAGE:CXX>:${_llvm_installer_pch_header}>")
+    endforeach()
+  endif()
+endif()
@@ -1,4 +1,5 @@
-import os, shutil, glob
+import os, sys, shutil, glob, hashlib, json, time, tempfile, contextlib
+from io import StringIO
 from conans import ConanFile, CMake, tools, RunEnvironment
 from conans.errors import ConanInvalidConfiguration
 from conans.tools import Version
@@ -121,6 +122,194 @@ llvm_libs = [
 # than you can clear default_llvm_libs (just disable in options all libs)
 default_llvm_libs = llvm_libs
 
+# Dependencies between `llvm_libs` (see `LINK_LIBS` and `LLVM_LINK_COMPONENTS`
+# in `lib/*/CMakeLists.txt` of llvm and clang).
+# Libraries that are not in `llvm_libs` (i.e. `LLVMCodeGen`, `LLVMDemangle`)
+# are omitted, `llvm-config --libs` resolves them for `llvm_link_mode=minimal`.
+llvm_lib_deps = {
+  'LLVMSupport': [],
+  'LLVMBinaryFormat': ['LLVMSupport'],
+  'LLVMCore': ['LLVMBinaryFormat', 'LLVMSupport'],
+  'LLVMMC': ['LLVMBinaryFormat', 'LLVMSupport'],
+  'LLVMMCParser': ['LLVMMC', 'LLVMSupport'],
+  'LLVMBitReader': ['LLVMCore', 'LLVMSupport'],
+  'LLVMObject': ['LLVMBinaryFormat', 'LLVMBitReader', 'LLVMCore', 'LLVMMC', 'LLVMMCParser', 'LLVMSupport'],
+  'LLVMProfileData': ['LLVMCore', 'LLVMSupport'],
+  'LLVMAnalysis': ['LLVMBinaryFormat', 'LLVMCore', 'LLVMObject', 'LLVMProfileData', 'LLVMSupport'],
+  'LLVMBitWriter': ['LLVMAnalysis', 'LLVMCore', 'LLVMMC', 'LLVMObject', 'LLVMSupport'],
+  'LLVMIRReader': ['LLVMBitReader', 'LLVMCore', 'LLVMSupport'],
+  'LLVMTransformUtils': ['LLVMAnalysis', 'LLVMCore', 'LLVMSupport'],
+  'LLVMInstCombine': ['LLVMAnalysis', 'LLVMCore', 'LLVMSupport', 'LLVMTransformUtils'],
+  'LLVMScalarOpts': ['LLVMAnalysis', 'LLVMCore', 'LLVMInstCombine', 'LLVMSupport', 'LLVMTransformUtils'],
+  'LLVMInstrumentation': ['LLVMAnalysis', 'LLVMCore', 'LLVMMC', 'LLVMProfileData', 'LLVMSupport',
+    'LLVMTransformUtils'],
+  'LLVMLinker': ['LLVMCore', 'LLVMSupport', 'LLVMTransformUtils'],
+  'LLVMVectorize': ['LLVMAnalysis', 'LLVMCore', 'LLVMSupport', 'LLVMTransformUtils'],
+  'LLVMipo': ['LLVMAnalysis', 'LLVMBitReader', 'LLVMBitWriter', 'LLVMCore', 'LLVMInstCombine',
+    'LLVMInstrumentation', 'LLVMIRReader', 'LLVMLinker', 'LLVMObject', 'LLVMProfileData',
+    'LLVMScalarOpts', 'LLVMSupport', 'LLVMTransformUtils', 'LLVMVectorize'],
+  'LLVMObjCARCOpts': ['LLVMAnalysis', 'LLVMCore', 'LLVMSupport', 'LLVMTransformUtils'],
+  'LLVMCoroutines': ['LLVMAnalysis', 'LLVMCore', 'LLVMipo', 'LLVMScalarOpts', 'LLVMSupport',
+    'LLVMTransformUtils'],
+  'LLVMCoverage': ['LLVMCore', 'LLVMObject', 'LLVMProfileData', 'LLVMSupport'],
+  'LLVMTarget': ['LLVMAnalysis', 'LLVMCore', 'LLVMMC', 'LLVMSupport'],
+  'LLVMPasses': ['LLVMAnalysis', 'LLVMCore', 'LLVMCoroutines', 'LLVMipo', 'LLVMInstCombine',
+    'LLVMInstrumentation', 'LLVMObjCARCOpts', 'LLVMScalarOpts', 'LLVMSupport', 'LLVMTarget',
+    'LLVMTransformUtils', 'LLVMVectorize'],
+  'LLVMLTO': ['LLVMAnalysis', 'LLVMBitReader', 'LLVMBitWriter', 'LLVMCore', 'LLVMipo', 'LLVMLinker',
+    'LLVMMC', 'LLVMObjCARCOpts', 'LLVMObject', 'LLVMPasses', 'LLVMScalarOpts', 'LLVMSupport',
+    'LLVMTarget', 'LLVMTransformUtils'],
+  'LLVMOption': ['LLVMSupport'],
+  'LLVMLibDriver': ['LLVMBinaryFormat', 'LLVMObject', 'LLVMOption', 'LLVMSupport'],
+  'LLVMLineEditor': ['LLVMSupport'],
+  'LLVMMIRParser': ['LLVMCore', 'LLVMMC', 'LLVMSupport', 'LLVMTarget'],
+  'LLVMRuntimeDyld': ['LLVMMC', 'LLVMObject', 'LLVMSupport'],
+  'LLVMSelectionDAG': ['LLVMAnalysis', 'LLVMCore', 'LLVMMC', 'LLVMSupport', 'LLVMTarget',
+    'LLVMTransformUtils'],
+  'LLVMSymbolize': ['LLVMObject', 'LLVMSupport'],
+  'LLVMTableGen': ['LLVMSupport'],
+  'clangBasic': ['LLVMCore', 'LLVMMC', 'LLVMSupport'],
+  'clangLex': ['clangBasic', 'LLVMSupport'],
+  'clangAST': ['clangBasic', 'clangLex', 'LLVMBinaryFormat', 'LLVMCore', 'LLVMSupport'],
+  'clangASTMatchers': ['clangAST', 'clangBasic', 'LLVMSupport'],
+  'clangDynamicASTMatchers': ['clangAST', 'clangASTMatchers', 'clangBasic', 'LLVMSupport'],
+  'clangAnalysis': ['clangAST', 'clangASTMatchers', 'clangBasic', 'clangLex', 'LLVMSupport'],
+  'clangEdit': ['clangAST', 'clangBasic', 'clangLex', 'LLVMSupport'],
+  'clangSema': ['clangAST', 'clangAnalysis', 'clangBasic', 'clangEdit', 'clangLex', 'LLVMSupport'],
+  'clangParse': ['clangAST', 'clangBasic', 'clangLex', 'clangSema', 'LLVMMC', 'LLVMMCParser',
+    'LLVMSupport'],
+  'clangSerialization': ['clangAST', 'clangBasic', 'clangLex', 'clangSema', 'LLVMBitReader',
+    'LLVMObject', 'LLVMSupport'],
+  'clangDriver': ['clangBasic', 'LLVMBinaryFormat', 'LLVMOption', 'LLVMSupport'],
+  'clangRewrite': ['clangBasic', 'clangLex', 'LLVMSupport'],
+  'clangToolingCore': ['clangAST', 'clangBasic', 'clangLex', 'clangRewrite', 'LLVMSupport'],
+  'clangFormat': ['clangBasic', 'clangLex', 'clangToolingCore', 'LLVMSupport'],
+  'clangFrontend': ['clangAST', 'clangBasic', 'clangDriver', 'clangEdit', 'clangLex', 'clangParse',
+    'clangSema', 'clangSerialization', 'LLVMBitReader', 'LLVMOption', 'LLVMProfileData', 'LLVMSupport'],
+  'clangIndex': ['clangAST', 'clangBasic', 'clangFormat', 'clangFrontend', 'clangLex', 'clangRewrite',
+    'clangSerialization', 'clangToolingCore', 'LLVMCore', 'LLVMSupport'],
+  'clangTooling': ['clangAST', 'clangASTMatchers', 'clangBasic', 'clangDriver', 'clangFormat',
+    'clangFrontend', 'clangLex', 'clangRewrite', 'clangSerialization', 'clangToolingCore',
+    'LLVMOption', 'LLVMSupport'],
+  'clangToolingRefactoring': ['clangAST', 'clangASTMatchers', 'clangBasic', 'clangFormat', 'clangIndex',
+    'clangLex', 'clangRewrite', 'clangToolingCore', 'LLVMSupport'],
+  'clangRewriteFrontend': ['clangAST', 'clangBasic', 'clangEdit', 'clangFrontend', 'clangLex',
+    'clangRewrite', 'clangSerialization', 'LLVMSupport'],
+  'clangCodeGen': ['clangAnalysis', 'clangAST', 'clangBasic', 'clangFrontend', 'clangLex',
+    'clangSerialization', 'LLVMAnalysis', 'LLVMBitReader', 'LLVMBitWriter', 'LLVMCore',
+    'LLVMCoroutines', 'LLVMCoverage', 'LLVMipo', 'LLVMIRReader', 'LLVMInstCombine',
+    'LLVMInstrumentation', 'LLVMLTO', 'LLVMLinker', 'LLVMMC', 'LLVMObjCARCOpts', 'LLVMObject',
+    'LLVMPasses', 'LLVMProfileData', 'LLVMScalarOpts', 'LLVMSupport', 'LLVMTarget',
+    'LLVMTransformUtils'],
+  'clangStaticAnalyzerCore': ['clangAST', 'clangASTMatchers', 'clangAnalysis', 'clangBasic',
+    'clangFrontend', 'clangLex', 'clangRewrite', 'LLVMSupport'],
+  'clangStaticAnalyzerCheckers': ['clangAST', 'clangASTMatchers', 'clangAnalysis', 'clangBasic',
+    'clangLex', 'clangStaticAnalyzerCore', 'LLVMSupport'],
+  'clangStaticAnalyzerFrontend': ['clangAST', 'clangAnalysis', 'clangBasic', 'clangFrontend', 'clangLex',
+    'clangStaticAnalyzerCheckers', 'clangStaticAnalyzerCore', 'LLVMSupport'],
+  'clangARCMigrate': ['clangAST', 'clangAnalysis', 'clangBasic', 'clangEdit', 'clangFrontend', 'clangLex',
+    'clangRewrite', 'clangSema', 'clangSerialization', 'clangStaticAnalyzerCheckers',
+    'clangStaticAnalyzerCore', 'LLVMSupport'],
+  'clangFrontendTool': ['clangBasic', 'clangCodeGen', 'clangDriver', 'clangFrontend',
+    'clangRewriteFrontend', 'clangARCMigrate', 'clangStaticAnalyzerFrontend', 'LLVMOption',
+    'LLVMSupport'],
+  # libclang (C API)
+  'clang': ['clangAST', 'clangBasic', 'clangDriver', 'clangFrontend', 'clangIndex', 'clangLex',
+    'clangSema', 'clangSerialization', 'clangTooling', 'LLVMSupport'],
+}
+
+# Returns `libraries` and all their dependencies from `llvm_lib_deps`,
+# ordered for static linking (each library goes before its dependencies).
+# USAGE
+# llvm_libs_closure(['clangTooling']) # ['clangTooling', ..., 'LLVMSupport']
+def llvm_libs_closure(libraries):
+    ordered = []
+    visited = set()
+    def visit(library):
+        if library in visited:
+          return
+        visited.add(library)
+        if not library in llvm_lib_deps:
+          raise ConanInvalidConfiguration("Unknown llvm library: {}".format(library))
+        for dependency in llvm_lib_deps[library]:
+          visit(dependency)
+        ordered.append(library)
+    for library in libraries:
+      visit(library)
+    return list(reversed(ordered))
+
+# Options that must be enabled by other options:
+# `with_all=True` enables all projects and targets,
+# `with_<lib>=True` enables all libs it depends on (see `llvm_lib_deps`).
+def required_llvm_options(options):
+    def enabled(key):
+        return str(options.get(key)) == 'True'
+    required = []
+    if enabled('with_all'):
+      required.extend(['with_' + name for name in llvm_projects + llvm_targets if name != 'all'])
+    libraries = [library for library in llvm_libs if enabled('with_' + library)]
+    required.extend(['with_' + library for library in llvm_libs_closure(libraries)])
+    return sorted(set([key for key in required if key in options]))
+
+# Canonical form of options forwarded to `llvm_xxx` (see `llvm_options`),
+# so equivalent sets of options give same package id of `llvm_xxx`:
+# `with_all=True` is expanded into all projects and targets (canonical value of `with_all` is `False`),
+# libs implied by enabled libs are always enabled (see `required_llvm_options`).
+# Explicit values changed here are reported, see `llvm_options_conflicts`.
+# Values are strings, 'ANY' (no default value) is kept as is.
+# USAGE
+# normalize_llvm_options({'with_all': 'True', 'with_lldb': 'False'}) # {'with_all': 'False', 'with_lldb': 'True'}
+def normalize_llvm_options(options):
+    normalized = dict([(key, str(value)) for (key, value) in options.items()])
+    for key in required_llvm_options(normalized):
+      if normalized[key] != 'ANY':
+        normalized[key] = 'True'
+    if normalized.get('with_all') == 'True':
+      normalized['with_all'] = 'False'
+    return normalized
+
+# Explicit values (differ from `defaults`) that `normalize_llvm_options` changed,
+# i.e. `with_LLVMSupport=False` with `with_LLVMCore=True` or `with_lldb=False` with `with_all=True`.
+# NOTE: conan does not tell if option was set explicitly to its default value.
+def llvm_options_conflicts(options, defaults):
+    normalized = normalize_llvm_options(options)
+    return [key for key in sorted(options.keys()) \
+      if key != 'with_all' \
+      and str(options[key]) != str(defaults.get(key)) \
+      and str(options[key]) != normalized[key]]
+
+# Pairs of option sets that must give same package id of `llvm_xxx`, see `normalize_llvm_options`
+def llvm_equivalent_options(defaults):
+    defaults = dict([(key, str(value)) for (key, value) in defaults.items()])
+    grouped = ['with_' + name for name in llvm_projects + llvm_targets if name != 'all']
+    # `with_all=True` vs list of all projects and targets
+    with_all = dict(defaults, with_all='True')
+    all_listed = dict(defaults, **dict([(key, 'True') for key in grouped if key in defaults]))
+    all_listed['with_all'] = 'False'
+    # implied lib disabled vs enabled
+    implied_disabled = dict(defaults, with_LLVMCore='True', with_LLVMSupport='False')
+    implied_enabled = dict(defaults, with_LLVMCore='True', with_LLVMSupport='True')
+    return [(with_all, all_listed), (implied_disabled, implied_enabled)]
+
+# Forwarded options that differ from defaults (both normalized),
+# each such set of options requires separate `llvm_xxx` binary i.e. (re-)build of LLVM.
+# 'ANY' default means `llvm_xxx` default, so any forwarded value is reported.
+# Returns list of `(key, default, value)`
+def llvm_options_diff(options, defaults):
+    options = normalize_llvm_options(options)
+    defaults = normalize_llvm_options(defaults)
+    diff = []
+    for key in sorted(options.keys()):
+      if options[key] != 'ANY' and options[key] != defaults.get(key):
+        diff.append((key, defaults.get(key), options[key]))
+    return diff
+
+# Shared libraries used by `llvm_link_mode=dylib`, can be found in `llvm_root/lib`
+llvm_dylibs = [
+  'libLLVM.so',
+  'libclang-cpp.so'
+]
+
 # Sanitizer is well supported on Linux
 # see https://clang.llvm.org/docs/MemorySanitizer.html#handling-external-code
 llvm_sanitizers = [
@@ -133,6 +322,130 @@ llvm_sanitizers = [
 # sanitizers disabled by default
 default_llvm_sanitizers = []
 
+# `package_info` checks that these tools exist in `llvm_root/bin`.
+# Results of checks are cached, see `toolchain_manifest_name`
+llvm_probed_tools = [
+  'clang++',
+  'clang',
+  'llvm-config',
+  'llvm-symbolizer',
+  'ld.lld',
+  'llvm-profdata',
+  'llvm-cov',
+  'llvm-dwp',
+  'llvm-ar',
+  'llvm-ranlib',
+  'llvm-nm',
+  'llvm-objdump'
+]
+
+# Sanitizer runtime (`libclang_rt.{runtime}.so`) used by `use_sanitizer`
+# or `compiler.sanitizer`, only one runtime can be loaded into process.
+# NOTE: asan runtime also provides ubsan, i.e. `Address;Undefined` uses asan
+# NOTE: `DataFlow` has no shared runtime, so it is not supported
+llvm_sanitizer_runtimes = {
+  'Address': 'asan',
+  'AddressUndefinedBehavior': 'asan',
+  'HWAddress': 'hwasan',
+  'Thread': 'tsan',
+  'Memory': 'msan',
+  'MemoryWithOrigins': 'msan',
+  'Undefined': 'ubsan_standalone',
+  'UndefinedBehavior': 'ubsan_standalone',
+  'Leak': 'lsan',
+  # `LLVM_USE_SANITIZER` name
+  'Leaks': 'lsan'
+}
+
+# conan arch -> arch used in names of `lib/clang/{clang_version}/lib/*` dirs and runtimes
+llvm_runtime_arch = {
+  'x86': 'i386',
+  'x86_64': 'x86_64',
+  'armv7': 'arm',
+  'armv7hf': 'armhf',
+  'armv8': 'aarch64'
+}
+
+# Language standards and first clang major version that supports them
+# (same as `Compiler/Clang-<LANG>.cmake` of CMake), used by generated toolchain file
+clang_language_standards = {
+  'C': [('90', 3), ('99', 3), ('11', 3), ('17', 6), ('23', 9)],
+  'CXX': [('98', 3), ('11', 3), ('14', 4), ('17', 5), ('20', 5), ('23', 12), ('26', 17)]
+}
+
+# Default language standard: `(first clang major version, standard)`, newest first
+clang_default_standards = {
+  'C': [(11, '17'), (3, '11')],
+  'CXX': [(16, '17'), (6, '14'), (3, '98')]
+}
+
+# Components of `llvm_xxx_installer` package,
+# see `requested_components` option
+installer_components = [
+  'libcxx',
+  'libclang_rt',
+  'clang_compiler',
+  'clang_headers',
+  'llvm_libs'
+]
+
+# Stores tool paths, resource dirs and sanitizer runtimes found in `llvm_xxx` package,
+# so `package_info` does not need to scan filesystem on each `conan install`.
+# Stored in per-user cache dir keyed by `llvm_xxx` package id (not in package folder,
+# it is re-created on each install with `build_policy = "always"`)
+toolchain_manifest_name = "toolchain_manifest.json"
+
+# Writes file using temporary file and `os.replace`,
+# so concurrent installs never read partially written file
+def write_file_atomic(path, content):
+    directory = os.path.dirname(path)
+    if not os.path.exists(directory):
+      os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+      with os.fdopen(fd, "w") as tmp_file:
+        tmp_file.write(content)
+      os.replace(tmp_path, path)
+    except:
+      if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+      raise
+
+# Options used only by `package_info` (flags, env. vars, etc.),
+# they do not change contents of `llvm_xxx_installer` package.
+# Removed from package id if `build_policy` is not `always`.
+consumer_options = [
+  'link_libcxx',
+  'compile_with_clang',
+  'linker',
+  'compiler_launcher',
+  'consumer_lto',
+  'thinlto_cache_dir',
+  'thinlto_cache_policy',
+  'thinlto_jobs',
+  'pgo',
+  'pgo_profile_dir',
+  'coverage',
+  'coverage_profile_dir',
+  'time_trace',
+  'time_trace_granularity',
+  'clang_headers_cache',
+  'modules_cache_path',
+  'debug_info',
+  'job_pools',
+  'llvm_link_mode',
+  'llvm_components',
+  'clang_libs',
+  'requested_components',
+  'toolchain_file',
+  'sanitizer_preload',
+  'sanitizer_symbolize',
+  'sanitizer_log_dir',
+  'distributed_compiler',
+  'distcc_hosts',
+  'distributed_jobs'
+]
+
 # Users locally they get the 1.0.0 version,
 # without defining any env-var at all,
 # and CI servers will append the build number.
@@ -147,6 +460,98 @@ def get_name(default):
     envvar = os.getenv("LLVM_INSTALLER_PACKAGE_NAME", default)
     return envvar
 
+# `always` - re-build package on each install.
+# `missing` - reuse binary package, package id depends on options
+# forwarded to `llvm_xxx` and on `llvm_xxx` package id.
+# USAGE
+# LLVM_INSTALLER_BUILD_POLICY=missing conan create . conan/stable
+def get_build_policy(default):
+    envvar = os.getenv("LLVM_INSTALLER_BUILD_POLICY", default)
+    return envvar
+
+# Collects flags of one component before they are written to `cpp_info`.
+# Each flag is added once (first occurrence wins) in stable order,
+# because flags are passed to each compiler and linker invocation.
+# NOTE: flags must not be split into multiple arguments
+# i.e. use `-isystem/path`, not `-isystem` and `/path`
+class ComponentFlags(object):
+    def __init__(self):
+        self.cxxflags = []
+        self.cflags = []
+        self.sharedlinkflags = []
+        self.exelinkflags = []
+
+    @staticmethod
+    def _add_unique(target, flags):
+        for flag in flags:
+          if not flag in target:
+            target.append(flag)
+
+    # Adds flags to both `cxxflags` and `cflags`
+    def add_build_flags(self, flags):
+        self._add_unique(self.cxxflags, flags)
+        self._add_unique(self.cflags, flags)
+
+    def add_cxx_flags(self, flags):
+        self._add_unique(self.cxxflags, flags)
+
+    # Adds flags to both `sharedlinkflags` and `exelinkflags`
+    def add_link_flags(self, flags):
+        self._add_unique(self.sharedlinkflags, flags)
+        self._add_unique(self.exelinkflags, flags)
+
+    def apply(self, component):
+        self._add_unique(component.cxxflags, self.cxxflags)
+        self._add_unique(component.cflags, self.cflags)
+        self._add_unique(component.sharedlinkflags, self.sharedlinkflags)
+        self._add_unique(component.exelinkflags, self.exelinkflags)
+
+# Path to JSON lines file with metrics of recipe methods
+# (wall time, number of filesystem probes, resolved paths), see `recipe_metrics`.
+# Disabled if not set.
+# USAGE
+# LLVM_INSTALLER_METRICS=$PWD/llvm_installer_metrics.jsonl conan install ...
+def get_metrics_path():
+    envvar = os.getenv("LLVM_INSTALLER_METRICS")
+    return envvar
+
+# Wraps body of recipe method, appends one JSON line per method call
+# to `LLVM_INSTALLER_METRICS` file.
+# USAGE
+# def configure(self):
+#     with recipe_metrics(self, "configure"):
+#       ...
+@contextlib.contextmanager
+def recipe_metrics(conanfile, method_name):
+    metrics_path = get_metrics_path()
+    if not metrics_path:
+      yield
+      return
+    conanfile._metrics = {"fs_probes": 0, "values": {}}
+    error = None
+    start = time.time()
+    try:
+      yield
+    except Exception as e:
+      error = str(e)
+      raise
+    finally:
+      record = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(start)),
+        "package": "{}/{}".format(conanfile.name, conanfile.version),
+        "method": method_name,
+        "wall_s": round(time.time() - start, 6),
+        "fs_probes": conanfile._metrics["fs_probes"],
+        "values": conanfile._metrics["values"],
+        "error": error
+      }
+      conanfile._metrics = None
+      try:
+        with open(metrics_path, "a") as metrics_file:
+          metrics_file.write(json.dumps(record, sort_keys=True) + "\n")
+      except (IOError, OSError) as e:
+        conanfile.output.warn("Unable to save {}: {}".format(metrics_path, str(e)))
+
 # see https://github.com/conan-io/conan-center-index/blob/master/recipes/protobuf/3.9.x/conanfile.py
 class Clang9InstallerConan(ConanFile):
     name = get_name("llvm_9_installer")
@@ -157,7 +562,7 @@ class Clang9InstallerConan(ConanFile):
     homepage = "https://github.com/blockspacer/llvm_9_installer"
     repo_url = 'https://github.com/blockspacer/llvm_9_installer.git'
     license = "MIT"
-    exports_sources = ["LICENSE.md"]
+    exports_sources = ["LICENSE.md", "scripts/*", "cmake/*"]
     generators = 'cmake_find_package', "cmake", "cmake_paths"
 
     # always - The package will be built always,
@@ -166,7 +571,8 @@ class Clang9InstallerConan(ConanFile):
     # each time the package is installed,
     # so it can be useful for providing a latest mechanism
     # or ignoring the uploaded binary packages.
-    build_policy = "always"
+    # Use `LLVM_INSTALLER_BUILD_POLICY=missing` to reuse binary packages.
+    build_policy = get_build_policy("always")
 
     short_paths = True
     settings = "os_build", "build_type", "arch_build", "compiler", "arch"
@@ -214,6 +620,94 @@ class Clang9InstallerConan(ConanFile):
         'link_libcxx': [True, False],
         # Will set `self.env_info.CXX` if `True`
         'compile_with_clang': [True, False],
+        # Will set `-fuse-ld=...` if not `default`.
+        # `lld` also sets `self.env_info.LD` to bundled `ld.lld`
+        'linker': ['default', 'lld', 'gold', 'bfd'],
+        # Will set `CMAKE_C_COMPILER_LAUNCHER` and `CMAKE_CXX_COMPILER_LAUNCHER`
+        # if not `none`. Launcher must be in `PATH`.
+        'compiler_launcher': ['none', 'ccache', 'sccache'],
+        # Will set `-flto=thin` or `-flto=full` if not `none`.
+        # Unlike `lto`, affects code that is built using bundled clang,
+        # not `llvm_xxx` dependency. Requires `linker=lld`.
+        'consumer_lto': ['none', 'thin', 'full'],
+        # ThinLTO cache, see https://clang.llvm.org/docs/ThinLTO.html#incremental
+        # 'None' means `~/.cache/llvm_xxx_installer/thinlto`
+        'thinlto_cache_dir': 'ANY',
+        'thinlto_cache_policy': 'ANY',
+        # 'None' means number of CPUs
+        'thinlto_jobs': 'ANY',
+        # Profile-guided optimization, see `scripts/llvm_pgo.py`
+        # `instrument` will set `-fprofile-instr-generate` and `LLVM_PROFILE_FILE`
+        # `use` will merge profiles and set `-fprofile-instr-use`
+        'pgo': ['off', 'instrument', 'use'],
+        # 'None' means `~/.cache/llvm_xxx_installer/pgo`
+        'pgo_profile_dir': 'ANY',
+        # Source-based code coverage, see `scripts/llvm_coverage.py`
+        # `True` will set `-fprofile-instr-generate -fcoverage-mapping` and `LLVM_PROFILE_FILE`
+        'coverage': [True, False],
+        # 'None' means `~/.cache/llvm_xxx_installer/coverage`
+        'coverage_profile_dir': 'ANY',
+        # Will set `-ftime-trace` if `True`, see `scripts/time_trace_report.py`
+        'time_trace': [True, False],
+        # Minimum time granularity (in microseconds) traced by `-ftime-trace`
+        'time_trace_granularity': 'ANY',
+        # Avoids re-parsing of LLVM/Clang headers in each translation unit,
+        # see `clang_headers` component.
+        # `pch` adds precompiled headers to `clang_headers` component target
+        # (and `llvm_installer_target_precompile_headers` cmake function),
+        # see `cmake/llvm_installer_pch.cmake`
+        # `modules` will set `-fmodules -fmodules-cache-path=...`
+        'clang_headers_cache': ['none', 'pch', 'modules'],
+        # 'None' means `~/.cache/llvm_xxx_installer/modules`
+        'modules_cache_path': 'ANY',
+        # Will set `-g` (`full`), `-gsplit-dwarf` (`split`),
+        # `-gline-tables-only` (`line-tables`) or `-g0` (`none`) if not `default`.
+        # `split` reduces size of objects and memory usage during linking,
+        # use `LLVM_DWP_PATH` to package `.dwo` files.
+        'debug_info': ['default', 'full', 'split', 'line-tables', 'none'],
+        # Will limit number of parallel compile and link jobs (Ninja only)
+        # based on cores and memory, see `cmake/llvm_installer_job_pools.cmake`
+        'job_pools': [True, False],
+        # How consumers link with LLVM/Clang libs, see `llvm_libs` component.
+        # `components` - static libs provided by `llvm_xxx` (`link_with_llvm_libs=True`)
+        # `dylib` - shared `libLLVM.so` and `libclang-cpp.so`
+        # `minimal` - only static libs required by `llvm_components` and `clang_libs`
+        # (transitive closure is resolved by `llvm-config --libs`)
+        'llvm_link_mode': ['components', 'dylib', 'minimal'],
+        # llvm-config components i.e. 'support,core,irreader' for `llvm_link_mode=minimal`
+        'llvm_components': 'ANY',
+        # Clang libs i.e. 'clangTooling,clangASTMatchers' for `llvm_link_mode=minimal`
+        # 'None' means no clang libs
+        'clang_libs': 'ANY',
+        # Components created by `package_info` i.e. 'clang_compiler,libcxx',
+        # other components (and their include, lib and resource paths) are skipped.
+        # 'all' means all components from `installer_components`
+        'requested_components': 'ANY',
+        # CMake toolchain file with pre-populated compiler ID, version, ABI, binutils
+        # and libc++ flags, so CMake skips compiler detection (try_compile probes).
+        # `generate` will set `LLVM_INSTALLER_TOOLCHAIN_FILE`
+        # `conan` will also set `CONAN_CMAKE_TOOLCHAIN_FILE` (used by conan `CMake` helper)
+        'toolchain_file': ['none', 'generate', 'conan'],
+        # Sanitizer runtime that matches `use_sanitizer` and target arch
+        # `build` will add it into `LD_PRELOAD` (affects all processes in build env.)
+        # `test` will set `SANITIZER_PRELOAD_PATH`, use it as `LD_PRELOAD` to run tests
+        'sanitizer_preload': ['build', 'test', 'none'],
+        # `offline` will set `symbolize=0` and `log_path` in `ASAN_OPTIONS`, `UBSAN_OPTIONS`, etc.,
+        # so failing processes do not spawn `llvm-symbolizer`,
+        # see `scripts/symbolize_sanitizer_logs.py`
+        'sanitizer_symbolize': ['online', 'offline'],
+        # 'None' means `~/.cache/llvm_xxx_installer/sanitizer_logs`
+        'sanitizer_log_dir': 'ANY',
+        # Distributed compilation using bundled clang, launcher must be in `PATH`.
+        # Chained with `compiler_launcher=ccache` using `CCACHE_PREFIX`.
+        # `icecc` will set `ICECC_VERSION` to relocatable toolchain tarball,
+        # see `scripts/llvm_toolchain_tarball.py`
+        'distributed_compiler': ['none', 'distcc', 'icecc'],
+        # i.e. 'localhost/4 build1/16 build2/16' ('None' means use ~/.distcc/hosts)
+        'distcc_hosts': 'ANY',
+        # Size of compile job pool (not limited by local cores) if `job_pools=True`
+        # 'None' means same as without distributed compilation
+        'distributed_jobs': 'ANY',
         'LLVM_PKG_NAME': 'ANY',
         'LLVM_PKG_VER': 'ANY',
         'LLVM_PKG_CHANNEL': 'ANY',
@@ -225,37 +719,90 @@ class Clang9InstallerConan(ConanFile):
       **{
         'link_libcxx': True,
         'compile_with_clang': True,
+        'linker': 'default',
+        'compiler_launcher': 'none',
+        'consumer_lto': 'none',
+        'thinlto_cache_dir': 'None',
+        'thinlto_cache_policy': 'prune_interval=20m:prune_after=168h:cache_size=10%:cache_size_bytes=20g',
+        'thinlto_jobs': 'None',
+        'pgo': 'off',
+        'pgo_profile_dir': 'None',
+        'coverage': False,
+        'coverage_profile_dir': 'None',
+        'time_trace': False,
+        'time_trace_granularity': '500',
+        'clang_headers_cache': 'none',
+        'modules_cache_path': 'None',
+        'debug_info': 'default',
+        'job_pools': True,
+        'llvm_link_mode': 'components',
+        'llvm_components': 'support',
+        'clang_libs': 'None',
+        'requested_components': 'all',
+        'toolchain_file': 'none',
+        'sanitizer_preload': 'build',
+        'sanitizer_symbolize': 'online',
+        'sanitizer_log_dir': 'None',
+        'distributed_compiler': 'none',
+        'distcc_hosts': 'None',
+        'distributed_jobs': 'None',
         'LLVM_PKG_NAME': "llvm_9",
         'LLVM_PKG_VER': "master",
         'LLVM_PKG_CHANNEL': "conan/stable",
-        'LLVM_CONAN_CLANG_VER': '9.0.1',
+        # 'None' means detect version (and resource dir) of bundled clang
+        'LLVM_CONAN_CLANG_VER': 'None',
     }}
 
     # Same as
     # self.options["llvm_xxx"].include_what_you_use = self.options.include_what_you_use
     # etc.
+    # Options are normalized first (see `normalize_llvm_options`),
+    # so own options (and package id) are also in canonical form.
     def set_dependency_options(self, dependency_name, dependency_options_dict):
         options_dict = dict([(key, value) for key, value in self.options.items()])
         for key in dependency_options_dict.keys():
           if (not key in options_dict.keys()):
             raise ConanInvalidConfiguration(str(key) + " must be in options")
+        # values before normalization (set by user in `configure`), see `llvm_options_conflicts`
+        self._user_llvm_options = dict([(key, str(getattr(self.options, key))) \
+          for key in dependency_options_dict.keys()])
+        normalized = self._normalized_options(dependency_options_dict)
+        for key in dependency_options_dict.keys():
+          if str(getattr(self.options, key)) != normalized[key]:
+            setattr(self.options, key, normalized[key])
           # 'ANY' - no default value
           if getattr(self.options, key) != 'ANY':
             setattr(self.options[dependency_name], key, getattr(self.options, key))
 
+    def _normalized_options(self, dependency_options_dict):
+        return normalize_llvm_options(dict([(key, getattr(self.options, key)) \
+          for key in dependency_options_dict.keys()]))
+
     # during package step we can check populated dependency options
     # and validate that we did not forget about some dependency option
     def check_options_same(self, dependency_name, dependency_options_dict):
+        normalized = self._normalized_options(dependency_options_dict)
         for key, value in self.options[dependency_name].items():
           # 'ANY' - no default value
           if (getattr(self.options, key) != 'ANY' \
             and not key in dependency_options_dict.keys()):
             raise ConanInvalidConfiguration(str(key) + " must be in llvm_options")
+          # package id of reusable binary depends on forwarded options,
+          # so they must match options of used dependency
+          if (normalized[key] != 'ANY' \
+            and normalized[key] != str(value)):
+            raise ConanInvalidConfiguration(str(key) + " must be same as " \
+              + dependency_name + ":" + str(key))
+        dependency_version = self.deps_cpp_info[dependency_name].version
+        if dependency_version != str(self.options.LLVM_PKG_VER):
+          raise ConanInvalidConfiguration("LLVM_PKG_VER must be same as " \
+            + dependency_name + " version: " + str(dependency_version))
 
     # config_options() is used to configure or constraint the available options
     # in a package, before they are given a value
     def config_options(self):
-        self.set_dependency_options(str(self.options.LLVM_PKG_NAME), self.llvm_options)
+        with recipe_metrics(self, "config_options"):
+          self.set_dependency_options(str(self.options.LLVM_PKG_NAME), self.llvm_options)
 
     # NOTE: do not use self.settings.compiler.sanitizer
     # because it may throw ConanException if 'settings.compiler.sanitizer'
@@ -273,25 +820,121 @@ class Clang9InstallerConan(ConanFile):
       return self.options.use_sanitizer != 'None'
 
     def configure(self):
-        self.set_dependency_options(str(self.options.LLVM_PKG_NAME), self.llvm_options)
+        with recipe_metrics(self, "configure"):
+          self.set_dependency_options(str(self.options.LLVM_PKG_NAME), self.llvm_options)
+          forwarded_options = self._user_llvm_options
+
+          # equivalent sets of options must give same options (and package id) of `llvm_xxx`
+          for (first, second) in llvm_equivalent_options(self.llvm_options):
+            first, second = normalize_llvm_options(first), normalize_llvm_options(second)
+            if first != second:
+              raise Exception("normalize_llvm_options gives different values of: {}".format(\
+                ", ".join([key for key in sorted(first.keys()) if first[key] != second.get(key)])))
 
-        if self._sanitizer != 'None' \
-           and not self._has_sanitizer_option:
-          raise ConanInvalidConfiguration("sanitizers require options.use_sanitizer!=None")
+          changed_options = llvm_options_conflicts(forwarded_options, self.llvm_options)
+          for key in changed_options:
+            self.output.warn("{}:{}={} is changed to True, it is required by other enabled options "
+              "(see required_llvm_options)".format(self.options.LLVM_PKG_NAME, key, forwarded_options[key]))
+          self._record_metric("changed_options", changed_options)
 
-        if self._sanitizer != 'None' \
-           and not self.options.link_libcxx:
-          raise ConanInvalidConfiguration("sanitizers require compiler.libcxx=libc++")
+          # options that require LLVM build (unless `llvm_xxx` with same options is in cache)
+          rebuild_options = llvm_options_diff(forwarded_options, self.llvm_options)
+          for (key, default, value) in rebuild_options:
+            self.output.info("{}:{}={} differs from default {}, requires separate {} binary".format(
+              self.options.LLVM_PKG_NAME, key, value, default, self.options.LLVM_PKG_NAME))
+          self._record_metric("rebuild_options", [key for (key, default, value) in rebuild_options])
 
-        if self._sanitizer != 'None' \
-           and not self.options.compile_with_clang:
-          raise ConanInvalidConfiguration("sanitizers require clang compiler")
+          if self._sanitizer != 'None' \
+             and not self._has_sanitizer_option:
+            raise ConanInvalidConfiguration("sanitizers require options.use_sanitizer!=None")
 
-        self.output.info("compiler is {}".format(str(self.settings.compiler)))
+          if self._sanitizer != 'None' \
+             and not self.options.link_libcxx:
+            raise ConanInvalidConfiguration("sanitizers require compiler.libcxx=libc++")
 
-        if (self._sanitizer != 'None' or self._has_sanitizer_option) \
-           and not "clang" in str(self.settings.compiler):
-          raise ConanInvalidConfiguration("sanitizer requires clang")
+          if self._sanitizer != 'None' \
+             and not self.options.compile_with_clang:
+            raise ConanInvalidConfiguration("sanitizers require clang compiler")
+
+          # throws if unknown sanitizer
+          if self._sanitizer != 'None' or self._has_sanitizer_option:
+            self._sanitizer_runtime_name
+
+          if self.options.sanitizer_symbolize == 'offline' \
+             and not self._has_sanitizer_option:
+            raise ConanInvalidConfiguration("sanitizer_symbolize=offline requires options.use_sanitizer!=None")
+
+          if self.options.sanitizer_symbolize == 'offline' \
+             and not "libclang_rt" in self._requested_components:
+            raise ConanInvalidConfiguration("sanitizer_symbolize=offline requires libclang_rt in requested_components")
+
+          if self.options.consumer_lto != 'none' \
+             and not self.options.compile_with_clang:
+            raise ConanInvalidConfiguration("consumer_lto requires clang compiler")
+
+          if self.options.consumer_lto != 'none' \
+             and self.options.linker != 'lld':
+            raise ConanInvalidConfiguration("consumer_lto requires linker=lld")
+
+          if self.options.pgo != 'off' \
+             and not self.options.compile_with_clang:
+            raise ConanInvalidConfiguration("pgo requires clang compiler")
+
+          if self.options.coverage \
+             and not self.options.compile_with_clang:
+            raise ConanInvalidConfiguration("coverage requires clang compiler")
+
+          # both use `-fprofile-instr-generate` and `LLVM_PROFILE_FILE`
+          if self.options.coverage \
+             and self.options.pgo == 'instrument':
+            raise ConanInvalidConfiguration("coverage can not be used with pgo=instrument")
+
+          if self.options.time_trace \
+             and not self.options.compile_with_clang:
+            raise ConanInvalidConfiguration("time_trace requires clang compiler")
+
+          if self.options.clang_headers_cache == 'modules' \
+             and not self.options.compile_with_clang:
+            raise ConanInvalidConfiguration("clang_headers_cache=modules requires clang compiler")
+
+          if self.options.debug_info == 'line-tables' \
+             and not self.options.compile_with_clang:
+            raise ConanInvalidConfiguration("debug_info=line-tables requires clang compiler")
+
+          if self.options.distributed_compiler != 'none' \
+             and not self.options.compile_with_clang:
+            raise ConanInvalidConfiguration("distributed_compiler requires clang compiler")
+
+          if self.options.distributed_compiler != 'none' \
+             and self.options.compiler_launcher == 'sccache':
+            raise ConanInvalidConfiguration("distributed_compiler can not be used with compiler_launcher=sccache")
+
+          if self.options.toolchain_file != 'none' \
+             and not self.options.compile_with_clang:
+            raise ConanInvalidConfiguration("toolchain_file requires clang compiler")
+
+          if self.options.llvm_link_mode != 'components' \
+             and str(self.options.link_with_llvm_libs) == "True":
+            raise ConanInvalidConfiguration(\
+              "llvm_link_mode={} can not be used with link_with_llvm_libs=True, "
+              "{} package would still add all static libs".format(\
+                self.options.llvm_link_mode, self.options.LLVM_PKG_NAME))
+
+          if self.options.llvm_link_mode == 'minimal':
+            # throws if unknown library
+            llvm_libs_closure(self._split_list(self.options.clang_libs))
+
+          for component in self._requested_components:
+            if not component in installer_components:
+              raise ConanInvalidConfiguration("Unknown component: {}, see installer_components".format(component))
+          if not self._requested_components:
+            raise ConanInvalidConfiguration("requested_components must not be empty")
+
+          self.output.info("compiler is {}".format(str(self.settings.compiler)))
+
+          if (self._sanitizer != 'None' or self._has_sanitizer_option) \
+             and not "clang" in str(self.settings.compiler):
+            raise ConanInvalidConfiguration("sanitizer requires clang")
 
     #def build_requirements(self):
     #    self.output.info("build requirements")
@@ -302,311 +945,1021 @@ class Clang9InstallerConan(ConanFile):
     #      self.options.LLVM_PKG_CHANNEL))
 
     def requirements(self):
-        self.output.info("requirements")
+        with recipe_metrics(self, "requirements"):
+          self.output.info("requirements")
 
-        self.requires("{}/{}@{}".format( \
-          self.options.LLVM_PKG_NAME, \
-          self.options.LLVM_PKG_VER, \
-          self.options.LLVM_PKG_CHANNEL))
+          self.requires("{}/{}@{}".format( \
+            self.options.LLVM_PKG_NAME, \
+            self.options.LLVM_PKG_VER, \
+            self.options.LLVM_PKG_CHANNEL))
 
     def package(self):
-        self.output.info("package")
-        self.check_options_same(str(self.options.LLVM_PKG_NAME), self.llvm_options)
+        with recipe_metrics(self, "package"):
+          self.output.info("package")
+          self.check_options_same(str(self.options.LLVM_PKG_NAME), self.llvm_options)
+
+          self.copy(pattern="LICENSE", dst="licenses", src=self.build_folder)
+          self.copy(pattern="*.py", dst="bin", src="scripts")
+          self.copy(pattern="*.cmake", dst="cmake", src="cmake")
+
+          llvm_root = self.deps_cpp_info[str(self.options.LLVM_PKG_NAME)].rootpath
+          # probes `llvm_xxx` package only if it changed
+          toolchain = self._load_toolchain_manifest(llvm_root)
 
-        self.copy(pattern="LICENSE", dst="licenses", src=self.build_folder)
+          if self.options.distributed_compiler == 'icecc':
+            self._icecc_toolchain_tarball(llvm_root)
+
+          # runs clang here, so `package_info` reads cached output
+          if self.options.toolchain_file != 'none':
+            self._clang_implicit_dirs(toolchain, \
+              self.options.link_libcxx and "libcxx" in self._requested_components)
+
+          # runs `llvm-config` here, so `package_info` reads cached output
+          if self.options.llvm_link_mode == 'minimal' \
+             and "llvm_libs" in self._requested_components:
+            _, llvm_components = self._minimal_llvm_libs()
+            self._llvm_config_libs(toolchain, llvm_components)
 
     # NOTE: It is build-time tool.
     # Any project configuration must be able to depend on it.
     def package_id(self):
-        self.output.info("package_id")
-        self.info.include_build_settings()
-        if self.settings.os_build == "Windows":
-            del self.info.settings.arch_build # same build is used for x86 and x86_64
-        del self.info.settings.arch
-        del self.info.settings.compiler
-        del self.info.settings.build_type
+        with recipe_metrics(self, "package_id"):
+          self.output.info("package_id")
+          self.info.include_build_settings()
+          if self.settings.os_build == "Windows":
+              del self.info.settings.arch_build # same build is used for x86 and x86_64
+          del self.info.settings.arch
+          del self.info.settings.compiler
+          del self.info.settings.build_type
+          if self.build_policy != "always":
+            # `toolchain_manifest_name` depends on exact `llvm_xxx` package
+            self.info.requires[str(self.options.LLVM_PKG_NAME)].full_package_mode()
+            for key in consumer_options:
+              delattr(self.info.options, key)
+
+    # NOTE: package id of `llvm_xxx` is last component of its rootpath
+    def _toolchain_manifest_key(self, llvm_root):
+        return {
+          # manifest must be re-created if list of tools changes
+          "llvm_probed_tools": llvm_probed_tools,
+          "llvm_dylibs": llvm_dylibs,
+          # sanitizer runtimes were probed by name before
+          "sanitizer_runtimes": "glob",
+          # resource dir was `lib/clang/{LLVM_CONAN_CLANG_VER}` before
+          "clang_resource_dir": "detected",
+          "llvm_package_id": os.path.basename(os.path.normpath(llvm_root)),
+          "llvm_rootpath": os.path.normpath(llvm_root),
+          # package may be re-built with same package id
+          "llvm_package_signature": self._llvm_package_signature(llvm_root),
+          "LLVM_CONAN_CLANG_VER": str(self.options.LLVM_CONAN_CLANG_VER)
+        }
+
+    # Changes if `llvm_xxx` package is re-created (conan writes new `conanmanifest.txt`)
+    def _llvm_package_signature(self, llvm_root):
+        self._count_fs_probe()
+        try:
+          stat = os.stat(os.path.join(llvm_root, "conanmanifest.txt"))
+          return "{}:{}".format(stat.st_size, stat.st_mtime)
+        except OSError:
+          return None
+
+    # Manifest without these entries is not saved (and is probed again on next install),
+    # so broken `llvm_xxx` package fixed later does not require manual cleanup
+    @staticmethod
+    def _toolchain_manifest_complete(manifest):
+        return manifest["key"]["llvm_package_signature"] is not None \
+          and all(manifest.get(entry) for entry in ["clang_resource_dir", "clang_incdir", "clang_libdir"]) \
+          and all(tool in manifest["tools"] for tool in ["clang", "clang++"])
+
+    # Scans `llvm_xxx` package, result is stored in `toolchain_manifest_name`
+    def _probe_toolchain(self, llvm_root):
+        manifest = {
+          "key": self._toolchain_manifest_key(llvm_root),
+          "tools": {},
+          # i.e. `llvm_root/lib/clang/9.0.1` and `9.0.1`, see `_detect_resource_dir`
+          "clang_resource_dir": None,
+          "clang_version": None,
+          "clang_incdir": None,
+          "clang_libdir": None,
+          "clang_libpaths": [],
+          "sanitizer_runtimes": [],
+          "dylibs": {},
+          # cached output of `llvm-config --libs`, see `_llvm_config_libs`
+          "llvm_config_libs": {},
+          # cached implicit include and link dirs of clang, see `_clang_implicit_dirs`
+          "implicit_dirs": {}
+        }
+
+        for tool in llvm_probed_tools:
+          path = os.path.join(llvm_root, "bin", tool)
+          if self._path_exists(path):
+            manifest["tools"][tool] = path
+
+        for dylib in llvm_dylibs:
+          path = os.path.join(llvm_root, "lib", dylib)
+          if self._path_exists(path):
+            manifest["dylibs"][dylib] = path
+
+        resource_dir = self._detect_resource_dir(llvm_root, manifest)
+        if not resource_dir:
+          return manifest
+        manifest["clang_resource_dir"] = resource_dir
+        manifest["clang_version"] = os.path.basename(resource_dir)
+
+        clang_incdir = os.path.join(resource_dir, "include")
+        if self._path_exists(clang_incdir):
+          manifest["clang_incdir"] = clang_incdir
+
+        clang_libdir = os.path.join(resource_dir, "lib")
+        if self._path_exists(clang_libdir):
+          manifest["clang_libdir"] = clang_libdir
+          # lib/clang/9.0.1/lib/linux,
+          # lib/clang/9.0.1/lib/x86_64-unknown-linux-gnu,
+          # etc.
+          manifest["clang_libpaths"] = sorted(\
+            [os.path.join(clang_libdir, f) for f in self._list_dir(clang_libdir)])
+          # libclang_rt.asan.so, libclang_rt.asan-x86_64.so, etc.
+          for path in manifest["clang_libpaths"]:
+            manifest["sanitizer_runtimes"].extend(\
+              sorted(self._glob(os.path.join(path, "libclang_rt.*.so"))))
+
+        return manifest
+
+    # Resource dir of bundled clang (headers like `stddef.h` and runtimes), i.e. `lib/clang/9.0.1`.
+    # Uses `lib/clang/{LLVM_CONAN_CLANG_VER}` if it exists, than `clang -print-resource-dir`,
+    # than latest version in `lib/clang`. Returns `None` if not found.
+    def _detect_resource_dir(self, llvm_root, manifest):
+        clang_root = os.path.join(llvm_root, "lib", "clang")
+        if str(self.options.LLVM_CONAN_CLANG_VER) != 'None':
+          resource_dir = os.path.join(clang_root, str(self.options.LLVM_CONAN_CLANG_VER))
+          if self._path_exists(resource_dir):
+            return resource_dir
+          self.output.warn("Unable to find path: {}, detecting clang version".format(resource_dir))
+        if "clang" in manifest["tools"]:
+          output = StringIO()
+          try:
+            self.run("\"{}\" -print-resource-dir".format(manifest["tools"]["clang"]), output=output)
+            resource_dir = output.getvalue().strip()
+            if resource_dir and self._path_exists(resource_dir):
+              return os.path.normpath(resource_dir)
+          except Exception as e:
+            self.output.warn("Unable to get resource dir from clang: {}".format(str(e)))
+        if not self._path_exists(clang_root):
+          return None
+        versions = [version for version in self._list_dir(clang_root) \
+          if version[:1].isdigit() and os.path.isdir(os.path.join(clang_root, version))]
+        if not versions:
+          return None
+        return os.path.join(clang_root, max(versions, key=Version))
+
+    # Files created per `llvm_xxx` package (manifest, icecc environment, etc.),
+    # i.e. `~/.cache/llvm_xxx_installer/toolchains/<llvm_xxx package id>`
+    def _toolchain_cache_dir(self, llvm_root):
+        return os.path.join(os.path.expanduser("~"), ".cache", self.name, "toolchains", \
+          os.path.basename(os.path.normpath(llvm_root)))
+
+    def _save_toolchain_manifest(self, manifest):
+        manifest_path = os.path.join(\
+          self._toolchain_cache_dir(manifest["key"]["llvm_rootpath"]), toolchain_manifest_name)
+        if not self._toolchain_manifest_complete(manifest):
+          self.output.warn("Incomplete toolchain manifest is not saved: {}".format(manifest_path))
+          return
+        try:
+          write_file_atomic(manifest_path, json.dumps(manifest, indent=2, sort_keys=True))
+        except (IOError, OSError) as e:
+          self.output.warn("Unable to save {}: {}".format(manifest_path, str(e)))
+
+    # Returns cached results of `_probe_toolchain`.
+    # Probes filesystem only if manifest is missing or out of date.
+    def _load_toolchain_manifest(self, llvm_root):
+        manifest_path = os.path.join(self._toolchain_cache_dir(llvm_root), toolchain_manifest_name)
+        if self._path_exists(manifest_path):
+          try:
+            with open(manifest_path, "r") as manifest_file:
+              manifest = json.load(manifest_file)
+            if manifest.get("key") == self._toolchain_manifest_key(llvm_root) \
+               and self._toolchain_manifest_complete(manifest):
+              self._record_metric("toolchain_manifest", "hit")
+              return manifest
+          except (ValueError, KeyError, OSError):
+            pass
+        self.output.info("probing toolchain in {}".format(llvm_root))
+        self._record_metric("toolchain_manifest", "miss")
+        manifest = self._probe_toolchain(llvm_root)
+        self._save_toolchain_manifest(manifest)
+        return manifest
+
+    # i.e. 'clangTooling, clangFormat' -> ['clangTooling', 'clangFormat']
+    @staticmethod
+    def _split_list(value):
+        value = str(value)
+        if value == 'None':
+          return []
+        return [item for item in value.replace(",", " ").split() if item]
+
+    @property
+    def _requested_components(self):
+        if str(self.options.requested_components) == 'all':
+          return installer_components
+        return self._split_list(self.options.requested_components)
+
+    # Returns `(clang_libs, llvm_components)` for `llvm_link_mode=minimal`,
+    # `clang_libs` include dependencies, `llvm_components` include components of `LLVM*` libs.
+    def _minimal_llvm_libs(self):
+        clang_libs = llvm_libs_closure(self._split_list(self.options.clang_libs))
+        # llvm-config component of `LLVMSupport` is `support`
+        llvm_components = self._split_list(self.options.llvm_components)
+        for library in clang_libs:
+          if library.startswith("LLVM"):
+            component = library[len("LLVM"):].lower()
+            if not component in llvm_components:
+              llvm_components.append(component)
+        return clang_libs, llvm_components
+
+    # Returns `(libs, system_libs)` required by llvm-config components.
+    # Output of `llvm-config` is cached in toolchain manifest (computed by `package`).
+    def _llvm_config_libs(self, manifest, components):
+        cache_key = " ".join(components)
+        cached = manifest["llvm_config_libs"].get(cache_key)
+        if cached:
+          return cached["libs"], cached["system_libs"]
+        llvm_config = self._find_tool(manifest, "llvm-config")
+        libs = []
+        system_libs = []
+        for (query, result) in [("--libs", libs), ("--system-libs", system_libs)]:
+          output = StringIO()
+          self.run("\"{}\" {} --link-static {}".format(llvm_config, query, cache_key), output=output)
+          for flag in output.getvalue().split():
+            if flag.startswith("-l"):
+              result.append(flag[len("-l"):])
+        manifest["llvm_config_libs"][cache_key] = {"libs": libs, "system_libs": system_libs}
+        self._save_toolchain_manifest(manifest)
+        return libs, system_libs
+
+    # Returns `{"C": [...], "CXX": [...], "link": [...], "library_architecture": ...}`,
+    # include dirs that clang searches by default and library search dirs,
+    # i.e. `/usr/include/x86_64-linux-gnu` and `/usr/lib/x86_64-linux-gnu` (`x86_64-linux-gnu` is library architecture).
+    # CMake detects them only if compiler is not forced, see `_generate_toolchain_file`.
+    # Output of clang is cached in toolchain manifest (computed by `package`).
+    def _clang_implicit_dirs(self, manifest, with_libcxx):
+        cache_key = "libc++" if with_libcxx else "default"
+        implicit_dirs = manifest.setdefault("implicit_dirs", {})
+        cached = implicit_dirs.get(cache_key)
+        if cached:
+          return cached
+        result = {"C": [], "CXX": [], "link": [], "library_architecture": None}
+        for (lang, tool, flags) in [("C", "clang", "-x c"), \
+                                    ("CXX", "clang++", "-x c++ -stdlib=libc++" if with_libcxx else "-x c++")]:
+          output = StringIO()
+          self.run("\"{}\" {} -E -v - < /dev/null 2>&1".format(self._find_tool(manifest, tool), flags), \
+            output=output, ignore_errors=True)
+          in_search_list = False
+          for line in output.getvalue().splitlines():
+            if line.startswith("#include <...> search starts here:"):
+              in_search_list = True
+            elif line.startswith("End of search list."):
+              in_search_list = False
+            elif in_search_list and line.startswith(" "):
+              # i.e. `/usr/local/include` or `/Library/Frameworks (framework directory)`
+              path = os.path.normpath(line.strip().split(" (")[0])
+              if not path in result[lang]:
+                result[lang].append(path)
+        output = StringIO()
+        self.run("\"{}\" -print-search-dirs".format(self._find_tool(manifest, "clang")), \
+          output=output, ignore_errors=True)
+        for line in output.getvalue().splitlines():
+          if line.startswith("libraries: ="):
+            for path in line[len("libraries: ="):].split(os.pathsep):
+              path = os.path.normpath(path)
+              if path and self._path_exists(path) and not path in result["link"]:
+                result["link"].append(path)
+        # same rule as `CMAKE_LIBRARY_ARCHITECTURE_REGEX` of CMake
+        for path in result["link"]:
+          parent, name = os.path.split(path)
+          if parent in ["/lib", "/usr/lib"] and "-linux-" in name:
+            result["library_architecture"] = name
+            break
+        implicit_dirs[cache_key] = result
+        self._save_toolchain_manifest(manifest)
+        return result
+
+    def _find_tool(self, manifest, tool):
+        path = manifest["tools"].get(tool)
+        if not path:
+          raise Exception("Unable to find path: {}".format(\
+            os.path.join(manifest["key"]["llvm_rootpath"], "bin", tool)))
+        return path
+
+    # Changes if compiler or flags that are not visible in command line
+    # (i.e. env. vars like `LD_PRELOAD`) may change,
+    # so compiler cache must not reuse objects from other configurations.
+    def _compiler_cache_key(self, toolchain, llvm_root):
+        key_parts = [
+          str(toolchain["clang_version"]),
+          # package id of llvm_xxx is part of path
+          os.path.normpath(llvm_root),
+          str(self.options.link_libcxx),
+          str(self.options.compile_with_clang),
+          str(self.options.use_sanitizer),
+          self._sanitizer
+        ]
+        return hashlib.sha1("|".join(key_parts).encode("utf-8")).hexdigest()
+
+    # Expected memory usage (MB) of one link job,
+    # used to size link job pool, see `cmake/llvm_installer_job_pools.cmake`
+    @property
+    def _link_job_memory_mb(self):
+        link_job_memory_mb = {
+          'default': 4096,
+          'bfd': 4096,
+          'gold': 3072,
+          'lld': 2048
+        }[str(self.options.linker)]
+        if self.options.consumer_lto == 'thin':
+          link_job_memory_mb *= 2
+        if self.options.consumer_lto == 'full':
+          link_job_memory_mb *= 4
+        # `dylib` and `minimal` link modes do not link all static libs
+        if str(self.options.link_with_llvm_libs) == "True" \
+           and self.options.llvm_link_mode == 'components':
+          link_job_memory_mb *= 2
+        return link_job_memory_mb
+
+    # Writes CMake toolchain file, file name depends on its content,
+    # so each configuration gets its own file and existing file is reused.
+    # Stored in per-user cache dir (package folder must not change in `package_info`).
+    # NOTE: `CMAKE_<LANG>_COMPILER_FORCED` skips compiler checks,
+    # so everything that CMake detects must be set here.
+    def _generate_toolchain_file(self, toolchain, libcxx_link_flags):
+        def cmake_string(value):
+            return "\"{}\"".format(str(value).replace("\\", "\\\\").replace("\"", "\\\""))
+
+        clang_ver = str(toolchain["clang_version"])
+        try:
+          clang_major = int(clang_ver.split(".")[0])
+        except ValueError:
+          raise Exception("Unable to detect clang version: {}".format(clang_ver))
+        arch = str(self.settings.get_safe("arch"))
+        sizeof_void_p = 4 if arch in ["x86", "armv7", "armv7hf", "armv6", "mips"] else 8
+        implicit_dirs = self._clang_implicit_dirs(toolchain, bool(libcxx_link_flags))
+        lines = []
+        lines.append("# Generated by {}, do not edit".format(self.name))
+        lines.append("include_guard(GLOBAL)")
+        for lang, tool in [("C", "clang"), ("CXX", "clang++")]:
+          lines.append("set(CMAKE_{}_COMPILER {})".format(lang, cmake_string(self._find_tool(toolchain, tool))))
+          lines.append("set(CMAKE_{}_COMPILER_ID \"Clang\")".format(lang))
+          lines.append("set(CMAKE_{}_COMPILER_VERSION {})".format(lang, cmake_string(clang_ver)))
+          lines.append("set(CMAKE_{}_COMPILER_ID_RUN TRUE)".format(lang))
+          lines.append("set(CMAKE_{}_COMPILER_FORCED TRUE)".format(lang))
+          lines.append("set(CMAKE_{}_COMPILER_WORKS TRUE)".format(lang))
+          lines.append("set(CMAKE_{}_ABI_COMPILED TRUE)".format(lang))
+          lines.append("set(CMAKE_{}_COMPILER_ABI \"ELF\")".format(lang))
+          lines.append("set(CMAKE_{}_SIZEOF_DATA_PTR {})".format(lang, sizeof_void_p))
+          lines.append("set(CMAKE_{}_IMPLICIT_INCLUDE_DIRECTORIES {})".format(\
+            lang, cmake_string(";".join(implicit_dirs[lang]))))
+          lines.append("set(CMAKE_{}_IMPLICIT_LINK_DIRECTORIES {})".format(\
+            lang, cmake_string(";".join(implicit_dirs["link"]))))
+          if implicit_dirs["library_architecture"]:
+            lines.append("set(CMAKE_{}_LIBRARY_ARCHITECTURE {})".format(\
+              lang, cmake_string(implicit_dirs["library_architecture"])))
+        lines.append("set(CMAKE_SIZEOF_VOID_P {})".format(sizeof_void_p))
+        if implicit_dirs["library_architecture"]:
+          lines.append("set(CMAKE_LIBRARY_ARCHITECTURE {})".format(\
+            cmake_string(implicit_dirs["library_architecture"])))
+        # i.e. clang 9 supports `c_std_17` and defaults to gnu11 and gnu++14
+        for (lang, prefix) in [("C", "c_std_"), ("CXX", "cxx_std_")]:
+          standards = [standard for (standard, first_major) in clang_language_standards[lang] \
+            if clang_major >= first_major]
+          default_standard = [standard for (first_major, standard) in clang_default_standards[lang] \
+            if clang_major >= first_major][0]
+          lines.append("set(CMAKE_{}_STANDARD_COMPUTED_DEFAULT {})".format(lang, default_standard))
+          for standard in standards:
+            lines.append("set(CMAKE_{}{}_COMPILE_FEATURES \"{}{}\")".format(lang, standard, prefix, standard))
+          lines.append("set(CMAKE_{}_COMPILE_FEATURES \"{}\")".format(\
+            lang, ";".join([prefix + standard for standard in standards])))
+        for (variable, tool) in [("CMAKE_AR", "llvm-ar"), ("CMAKE_RANLIB", "llvm-ranlib"), \
+                                 ("CMAKE_NM", "llvm-nm"), ("CMAKE_OBJDUMP", "llvm-objdump")]:
+          lines.append("set({} {} CACHE FILEPATH \"\")".format(variable, cmake_string(self._find_tool(toolchain, tool))))
+        if self.options.linker == 'lld':
+          lines.append("set(CMAKE_LINKER {} CACHE FILEPATH \"\")".format(\
+            cmake_string(self._find_tool(toolchain, "ld.lld"))))
+        if libcxx_link_flags:
+          lines.append("set(CMAKE_CXX_FLAGS_INIT \"-stdlib=libc++\")")
+          for variable in ["CMAKE_EXE_LINKER_FLAGS_INIT", "CMAKE_SHARED_LINKER_FLAGS_INIT", \
+                           "CMAKE_MODULE_LINKER_FLAGS_INIT"]:
+            lines.append("set({} {})".format(variable, cmake_string(" ".join(libcxx_link_flags))))
+        content = "\n".join(lines) + "\n"
+
+        content_hash = hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+        toolchain_file = os.path.join(self._toolchain_cache_dir(toolchain["key"]["llvm_rootpath"]), \
+          "llvm_installer_toolchain_{}.cmake".format(content_hash))
+        if not self._path_exists(toolchain_file):
+          write_file_atomic(toolchain_file, content)
+        return toolchain_file
+
+    # Name of sanitizer runtime (see `llvm_sanitizer_runtimes`) that matches `use_sanitizer`
+    # (or `compiler.sanitizer`), validated by `configure` before `llvm_xxx` is built
+    @property
+    def _sanitizer_runtime_name(self):
+        runtime = None
+        sanitizers = str(self.options.use_sanitizer).split(";") if self._has_sanitizer_option else []
+        if self._sanitizer != 'None':
+          sanitizers.append(self._sanitizer)
+        for sanitizer in sanitizers:
+          if not sanitizer in llvm_sanitizer_runtimes:
+            raise ConanInvalidConfiguration("Unknown sanitizer: {}, see llvm_sanitizer_runtimes".format(sanitizer))
+          if runtime and runtime != 'ubsan_standalone':
+            continue
+          # i.e. `Address;Undefined` must use asan, not ubsan_standalone
+          runtime = llvm_sanitizer_runtimes[sanitizer]
+        if not runtime:
+          raise ConanInvalidConfiguration("Unknown sanitizer: {}".format(";".join(sanitizers)))
+        return runtime
+
+    # Returns path to sanitizer runtime that matches `use_sanitizer`
+    # (or `compiler.sanitizer`) and target arch.
+    # Runtime can be found in
+    # lib/clang/9.0.1/lib/x86_64-unknown-linux-gnu/libclang_rt.asan.so (per-target dir) or
+    # lib/clang/9.0.1/lib/linux/libclang_rt.asan-x86_64.so
+    def _sanitizer_runtime(self, toolchain):
+        runtime = self._sanitizer_runtime_name
+        arch = str(self.settings.get_safe("arch"))
+        runtime_arch = llvm_runtime_arch.get(arch, arch)
+        candidates = [
+          os.path.join("{}-unknown-linux-gnu".format(runtime_arch), "libclang_rt.{}.so".format(runtime)),
+          os.path.join("linux", "libclang_rt.{}-{}.so".format(runtime, runtime_arch))
+        ]
+        for candidate in candidates:
+          for sanlib in toolchain["sanitizer_runtimes"]:
+            if sanlib.endswith(os.sep + candidate):
+              return sanlib
+        raise Exception("Unable to find path: {}".format(\
+          os.path.join(toolchain["clang_libdir"], candidates[0])))
+
+    # Relocatable icecc environment with bundled clang,
+    # created once per `llvm_xxx` package (can take some time) by `package`.
+    # Stored in per-user cache dir, so it is reused by re-created packages (`build_policy = "always"`).
+    def _icecc_toolchain_tarball(self, llvm_root):
+        tarball_dir = os.path.join(self._toolchain_cache_dir(llvm_root), "icecc")
+        tarballs = self._glob(os.path.join(tarball_dir, "*.tar.gz"))
+        if not tarballs:
+          self.output.info("creating icecc environment in {}".format(tarball_dir))
+          self.run("\"{}\" \"{}\" --format icecc --llvm-root \"{}\" --output-dir \"{}\"".format(\
+            sys.executable, \
+            os.path.join(self.package_folder, "bin", "llvm_toolchain_tarball.py"), \
+            llvm_root, tarball_dir))
+          tarballs = self._glob(os.path.join(tarball_dir, "*.tar.gz"))
+          if not tarballs:
+            raise Exception("Unable to find path: {}".format(os.path.join(tarball_dir, "*.tar.gz")))
+        return tarballs[0]
+
+    @property
+    def _pgo_profile_dir(self):
+        pgo_profile_dir = str(self.options.pgo_profile_dir)
+        if pgo_profile_dir == 'None':
+          pgo_profile_dir = os.path.join(os.path.expanduser("~"), ".cache", self.name, "pgo")
+        return pgo_profile_dir
+
+    @property
+    def _coverage_profile_dir(self):
+        coverage_profile_dir = str(self.options.coverage_profile_dir)
+        if coverage_profile_dir == 'None':
+          coverage_profile_dir = os.path.join(os.path.expanduser("~"), ".cache", self.name, "coverage")
+        return coverage_profile_dir
+
+    # Runs `scripts/llvm_pgo.py merge` (passes profiles using response file,
+    # so thousands of profiles do not hit command line limits),
+    # skips merge if merged profile is up to date
+    def _merge_pgo_profiles(self, llvm_profdata, profile_dir):
+        merged = os.path.join(profile_dir, "merged.profdata")
+        profiles = self._glob(os.path.join(profile_dir, "*.profraw"))
+        if not profiles:
+          if not self._path_exists(merged):
+            raise Exception("Unable to find profiles in: {}".format(profile_dir))
+          return merged
+        if self._path_exists(merged) \
+           and os.path.getmtime(merged) >= max([os.path.getmtime(f) for f in profiles]):
+          return merged
+        with tools.environment_append({"LLVM_PROFDATA_PATH": llvm_profdata}):
+          self.run("\"{}\" \"{}\" merge --profile-dir \"{}\" --output \"{}\"".format(\
+            sys.executable, \
+            os.path.join(self.package_folder, "bin", "llvm_pgo.py"), \
+            profile_dir, merged))
+        return merged
+
+    # Filesystem access used by probes is counted, see `recipe_metrics`
+    def _count_fs_probe(self):
+        if getattr(self, "_metrics", None):
+          self._metrics["fs_probes"] += 1
+
+    def _path_exists(self, path):
+        self._count_fs_probe()
+        return os.path.exists(path)
+
+    def _list_dir(self, path):
+        self._count_fs_probe()
+        return os.listdir(path)
+
+    def _glob(self, pattern):
+        self._count_fs_probe()
+        return glob.glob(pattern)
+
+    # Stores resolved path (or other value) in metrics, see `recipe_metrics`
+    def _record_metric(self, key, value):
+        if getattr(self, "_metrics", None):
+          self._metrics["values"][key] = value
 
     def prepend_to(self, var, value):
       return value + " " + str(var)
 
     def package_info(self):
-        self.output.info("package_info")
-
-        cxxflags = []
-        cflags = []
-        ldflags = []
-        common_build_flags = []
-        common_link_flags = []
-
-        # llvm_core clang_core llvm_tools
-        self.cpp_info.components["libcxx"].names["cmake_find_package"] = "libcxx"
-        self.cpp_info.components["libcxx"].names["cmake_find_package_multi"] = "libcxx"
-        self.cpp_info.components["libcxx"].requires = [\
-          "{}::{}".format(self.options.LLVM_PKG_NAME, self.options.LLVM_PKG_NAME)]
-        if self.options[str(self.options.LLVM_PKG_NAME)].add_to_includedirs:
-          self.cpp_info.components["libcxx"].requires.extend([\
-            "{}::includedirs".format(self.options.LLVM_PKG_NAME)])
-        if self.options[str(self.options.LLVM_PKG_NAME)].add_to_libdirs:
-          self.cpp_info.components["libcxx"].requires.extend([\
-            "{}::libdirs".format(self.options.LLVM_PKG_NAME)])
-
-        self.cpp_info.components["libclang_rt"].names["cmake_find_package"] = "libclang_rt"
-        self.cpp_info.components["libclang_rt"].names["cmake_find_package_multi"] = "libclang_rt"
-        self.cpp_info.components["libclang_rt"].requires = [\
-          "{}::{}".format(self.options.LLVM_PKG_NAME, self.options.LLVM_PKG_NAME)]
-        if self.options[str(self.options.LLVM_PKG_NAME)].link_with_llvm_libs:
-          self.cpp_info.components["libclang_rt"].requires.extend(\
-            ["{}::clang_core".format(self.options.LLVM_PKG_NAME), \
-             "{}::llvm_core".format(self.options.LLVM_PKG_NAME)])
-
-        self.cpp_info.components["clang_compiler"].names["cmake_find_package"] = "clang_compiler"
-        self.cpp_info.components["clang_compiler"].names["cmake_find_package_multi"] = "llvm_tools"
-        self.cpp_info.components["clang_compiler"].requires = [\
-          "{}::{}".format(self.options.LLVM_PKG_NAME, self.options.LLVM_PKG_NAME)]
-        if self.options[str(self.options.LLVM_PKG_NAME)].add_to_bindirs:
-          self.cpp_info.components["clang_compiler"].requires.extend(\
-            ["{}::llvm_tools".format(self.options.LLVM_PKG_NAME), \
-             "{}::bindirs".format(self.options.LLVM_PKG_NAME)])
-
-        llvm_root = self.deps_cpp_info[str(self.options.LLVM_PKG_NAME)].rootpath
-        self.env_info.LLVM_NORMPATH = os.path.normpath(llvm_root)
-        self.output.info("llvm rootpath: {}".format(llvm_root))
-        #
-        self.env_info.IWYU_PATH = os.path.join(llvm_root, "bin", "include-what-you-use")
-        self.env_info.CLANG_FORMAT_PATH = os.path.join(llvm_root, "bin", "clang-format")
-        self.env_info.SCAN_BUILD_PATH = os.path.join(llvm_root, "bin", "scan-build")
-        self.env_info.CLANG_TIDY_PATH = os.path.join(llvm_root, "bin", "clang-tidy")
-
-        self.env_info.CPP_ANALYZER_PATH = os.path.join(llvm_root, "libexec", "c++-analyzer")
-        self.env_info.CCC_ANALYZER_PATH = os.path.join(llvm_root, "libexec", "ccc-analyzer")
-
-        if self.options.link_libcxx:
-          for path in self.deps_cpp_info.res_paths:
-              self.cpp_info.components["libcxx"].resdirs.append(path)
-
-        if self.options.link_libcxx:
-          self.cpp_info.components["libcxx"].includedirs.append(llvm_root)
-          self.cpp_info.components["libcxx"].includedirs.append(os.path.join(llvm_root, "include"))
-          for path in self.deps_cpp_info.include_paths:
-              self.cpp_info.components["libcxx"].includedirs.append(path)
-
-        if self.options.link_libcxx:
-          self.env_info.LD_LIBRARY_PATH.append(os.path.join(llvm_root, "lib"))
-          for path in self.deps_cpp_info.lib_paths:
-              self.env_info.LD_LIBRARY_PATH.append(path)
-
-        self.env_info.PATH.append(os.path.join(llvm_root, "bin"))
-        self.env_info.PATH.append(os.path.join(llvm_root, "libexec"))
-        for path in self.deps_cpp_info.bin_paths:
-            self.env_info.PATH.append(path)
-        #
-        if self.options.compile_with_clang:
-          # see https://docs.conan.io/en/latest/systems_cross_building/cross_building.html
-          # and https://www.gnu.org/software/make/manual/html_node/Implicit-Variables.html
-          CXX = os.path.join(llvm_root, "bin", "clang++")
-          if not os.path.exists(CXX):
-            raise Exception("Unable to find path: {}".format(CXX))
-          self.env_info.CXX = CXX
-
-          CC = os.path.join(llvm_root, "bin", "clang")
-          if not os.path.exists(CC):
-            raise Exception("Unable to find path: {}".format(CC))
-          self.env_info.CC = CC
-
-          # TODO: use llvm-ar or llvm-lib?
-          # AR = os.path.join(llvm_root, "bin", "llvm-ar")
-          # if not os.path.exists(AR):
-          #   raise Exception("Unable to find path: {}".format(AR))
-          # self.env_info.AR = AR
-          #
-          #STRIP = os.path.join(llvm_root, "bin", "llvm-strip")
-          #if not os.path.exists(STRIP):
-          #  raise Exception("Unable to find path: {}".format(STRIP))
-          #self.env_info.STRIP = STRIP
-          #
-          # # TODO: use lld-link or ld.lld?
-          # # NOTE: llvm-ld replaced by llvm-ld
-          # LD = os.path.join(llvm_root, "bin", "ld.lld")
-          # if not os.path.exists(LD):
-          #   raise Exception("Unable to find path: {}".format(LD))
-          # self.env_info.LD = LD
-          #
-          #NM = os.path.join(llvm_root, "bin", "llvm-nm")
-          #if not os.path.exists(NM):
-          #  raise Exception("Unable to find path: {}".format(NM))
-          #self.env_info.NM = NM
-          #
-          # TODO:
-          # ADDR2LINE
-          #
-          # TODO:
-          # ELFEDIT
+        with recipe_metrics(self, "package_info"):
+          self.output.info("package_info")
+
+          cxxflags = []
+          cflags = []
+          ldflags = []
+          common_build_flags = []
+          common_link_flags = []
+
+          requested_components = self._requested_components
+          with_libcxx = self.options.link_libcxx and "libcxx" in requested_components
+          # build and link flags are added to these components
+          flag_components = [component for component in ["libcxx", "clang_compiler"] \
+            if component in requested_components]
+          # flags are written to `self.cpp_info.components` at the end of `package_info`
+          component_flags = dict([(component, ComponentFlags()) for component in installer_components])
+
+          # llvm_core clang_core llvm_tools
+          if "libcxx" in requested_components:
+            self.cpp_info.components["libcxx"].names["cmake_find_package"] = "libcxx"
+            self.cpp_info.components["libcxx"].names["cmake_find_package_multi"] = "libcxx"
+            self.cpp_info.components["libcxx"].requires = [\
+              "{}::{}".format(self.options.LLVM_PKG_NAME, self.options.LLVM_PKG_NAME)]
+            if self.options[str(self.options.LLVM_PKG_NAME)].add_to_includedirs:
+              self.cpp_info.components["libcxx"].requires.extend([\
+                "{}::includedirs".format(self.options.LLVM_PKG_NAME)])
+            if self.options[str(self.options.LLVM_PKG_NAME)].add_to_libdirs:
+              self.cpp_info.components["libcxx"].requires.extend([\
+                "{}::libdirs".format(self.options.LLVM_PKG_NAME)])
+
+          if "libclang_rt" in requested_components:
+            self.cpp_info.components["libclang_rt"].names["cmake_find_package"] = "libclang_rt"
+            self.cpp_info.components["libclang_rt"].names["cmake_find_package_multi"] = "libclang_rt"
+            self.cpp_info.components["libclang_rt"].requires = [\
+              "{}::{}".format(self.options.LLVM_PKG_NAME, self.options.LLVM_PKG_NAME)]
+            if self.options[str(self.options.LLVM_PKG_NAME)].link_with_llvm_libs \
+               and self.options.llvm_link_mode == 'components':
+              self.cpp_info.components["libclang_rt"].requires.extend(\
+                ["{}::clang_core".format(self.options.LLVM_PKG_NAME), \
+                 "{}::llvm_core".format(self.options.LLVM_PKG_NAME)])
+
+          if "clang_compiler" in requested_components:
+            self.cpp_info.components["clang_compiler"].names["cmake_find_package"] = "clang_compiler"
+            self.cpp_info.components["clang_compiler"].names["cmake_find_package_multi"] = "llvm_tools"
+            self.cpp_info.components["clang_compiler"].requires = [\
+              "{}::{}".format(self.options.LLVM_PKG_NAME, self.options.LLVM_PKG_NAME)]
+            if self.options[str(self.options.LLVM_PKG_NAME)].add_to_bindirs:
+              self.cpp_info.components["clang_compiler"].requires.extend(\
+                ["{}::llvm_tools".format(self.options.LLVM_PKG_NAME), \
+                 "{}::bindirs".format(self.options.LLVM_PKG_NAME)])
+
+          # link with `clang_headers` to avoid re-parsing of LLVM/Clang headers
+          if self.options.clang_headers_cache != 'none' \
+             and "clang_headers" in requested_components:
+            self.cpp_info.components["clang_headers"].names["cmake_find_package"] = "clang_headers"
+            self.cpp_info.components["clang_headers"].names["cmake_find_package_multi"] = "clang_headers"
+            self.cpp_info.components["clang_headers"].requires = [\
+              "{}::{}".format(self.options.LLVM_PKG_NAME, self.options.LLVM_PKG_NAME)]
+            if self.options.clang_headers_cache == 'pch':
+              self.cpp_info.components["clang_headers"].build_modules.append(\
+                os.path.join("cmake", "llvm_installer_pch.cmake"))
+            if self.options.clang_headers_cache == 'modules':
+              modules_cache_path = str(self.options.modules_cache_path)
+              if modules_cache_path == 'None':
+                modules_cache_path = os.path.join(os.path.expanduser("~"), ".cache", self.name, "modules")
+              # see https://clang.llvm.org/docs/Modules.html
+              modules_build_flags = []
+              modules_build_flags.append("-fmodules")
+              modules_build_flags.append("-fcxx-modules")
+              modules_build_flags.append("-fmodules-cache-path={}".format(modules_cache_path))
+              component_flags["clang_headers"].add_cxx_flags(modules_build_flags)
+
+          if self.options.job_pools \
+             and "clang_compiler" in requested_components:
+            self.cpp_info.components["clang_compiler"].build_modules.append(\
+              os.path.join("cmake", "llvm_installer_job_pools.cmake"))
+            self.env_info.LLVM_INSTALLER_LINK_JOB_MEMORY_MB = str(self._link_job_memory_mb)
+
+          llvm_root = self.deps_cpp_info[str(self.options.LLVM_PKG_NAME)].rootpath
+          self.env_info.LLVM_NORMPATH = os.path.normpath(llvm_root)
+          self.output.info("llvm rootpath: {}".format(llvm_root))
+          self._record_metric("llvm_root", llvm_root)
+          toolchain = self._load_toolchain_manifest(llvm_root)
+          self._record_metric("tools", toolchain["tools"])
+          self._record_metric("clang_resource_dir", toolchain["clang_resource_dir"])
+          if toolchain["clang_resource_dir"]:
+            self.env_info.LLVM_CLANG_RESOURCE_DIR = toolchain["clang_resource_dir"]
+            self.env_info.LLVM_CLANG_VERSION = toolchain["clang_version"]
+
+          # link with `llvm_libs` instead of all static libs from `llvm_xxx`
+          if self.options.llvm_link_mode != 'components' \
+             and "llvm_libs" in requested_components:
+            self.cpp_info.components["llvm_libs"].names["cmake_find_package"] = "llvm_libs"
+            self.cpp_info.components["llvm_libs"].names["cmake_find_package_multi"] = "llvm_libs"
+            self.cpp_info.components["llvm_libs"].requires = [\
+              "{}::{}".format(self.options.LLVM_PKG_NAME, self.options.LLVM_PKG_NAME)]
+            self.cpp_info.components["llvm_libs"].libdirs = [os.path.join(llvm_root, "lib")]
+            if self.options.llvm_link_mode == 'dylib':
+              for dylib in llvm_dylibs:
+                if not dylib in toolchain["dylibs"]:
+                  raise Exception("Unable to find path: {}".format(\
+                    os.path.join(llvm_root, "lib", dylib)))
+              # libLLVM.so -> LLVM
+              self.cpp_info.components["llvm_libs"].libs = \
+                [dylib[len("lib"):-len(".so")] for dylib in llvm_dylibs]
+              self.cpp_info.components["llvm_libs"].exelinkflags.append(\
+                "-Wl,-rpath,{}".format(os.path.join(llvm_root, "lib")))
+              self.cpp_info.components["llvm_libs"].sharedlinkflags.append(\
+                "-Wl,-rpath,{}".format(os.path.join(llvm_root, "lib")))
+            if self.options.llvm_link_mode == 'minimal':
+              clang_libs, llvm_components = self._minimal_llvm_libs()
+              libs, system_libs = self._llvm_config_libs(toolchain, llvm_components)
+              self.cpp_info.components["llvm_libs"].libs = \
+                [library for library in clang_libs if not library.startswith("LLVM")] + libs
+              self.cpp_info.components["llvm_libs"].system_libs = system_libs
           #
-          LLVM_CONFIG_PATH = os.path.join(llvm_root, "bin", "llvm-config")
-          if not os.path.exists(LLVM_CONFIG_PATH):
-            raise Exception("Unable to find path: {}".format(LLVM_CONFIG_PATH))
-          self.env_info.LLVM_CONFIG_PATH = LLVM_CONFIG_PATH
+          self.env_info.IWYU_PATH = os.path.join(llvm_root, "bin", "include-what-you-use")
+          self.env_info.CLANG_FORMAT_PATH = os.path.join(llvm_root, "bin", "clang-format")
+          self.env_info.SCAN_BUILD_PATH = os.path.join(llvm_root, "bin", "scan-build")
+          self.env_info.CLANG_TIDY_PATH = os.path.join(llvm_root, "bin", "clang-tidy")
+
+          self.env_info.CPP_ANALYZER_PATH = os.path.join(llvm_root, "libexec", "c++-analyzer")
+          self.env_info.CCC_ANALYZER_PATH = os.path.join(llvm_root, "libexec", "ccc-analyzer")
+          # used by `run_clang_analyzer.py --ctu`
+          self.env_info.CLANG_EXTDEF_MAPPING_PATH = os.path.join(llvm_root, "bin", "clang-extdef-mapping")
+
+          self.env_info.LLVM_PROFDATA_PATH = os.path.join(llvm_root, "bin", "llvm-profdata")
+
+          # helper scripts i.e. `llvm_pgo.py`
+          self.env_info.PATH.append(os.path.join(self.package_folder, "bin"))
+
+          if with_libcxx:
+            for path in self.deps_cpp_info.res_paths:
+                self.cpp_info.components["libcxx"].resdirs.append(path)
+
+          if with_libcxx:
+            self.cpp_info.components["libcxx"].includedirs.append(llvm_root)
+            self.cpp_info.components["libcxx"].includedirs.append(os.path.join(llvm_root, "include"))
+            for path in self.deps_cpp_info.include_paths:
+                self.cpp_info.components["libcxx"].includedirs.append(path)
+
+          if with_libcxx:
+            self.env_info.LD_LIBRARY_PATH.append(os.path.join(llvm_root, "lib"))
+            for path in self.deps_cpp_info.lib_paths:
+                self.env_info.LD_LIBRARY_PATH.append(path)
+
+          self.env_info.PATH.append(os.path.join(llvm_root, "bin"))
+          self.env_info.PATH.append(os.path.join(llvm_root, "libexec"))
+          for path in self.deps_cpp_info.bin_paths:
+              self.env_info.PATH.append(path)
           #
-          # # TODO: propagate to CMAKE_OBJDUMP?
-          # OBJDUMP = os.path.join(llvm_root, "bin", "llvm-objdump")
-          # if not os.path.exists(OBJDUMP):
-          #   raise Exception("Unable to find path: {}".format(OBJDUMP))
-          # self.env_info.OBJDUMP = OBJDUMP
-
-          SYMBOLIZER = os.path.join(llvm_root, "bin", "llvm-symbolizer")
-          if not os.path.exists(SYMBOLIZER):
-            raise Exception("Unable to find path: {}".format(SYMBOLIZER))
-          self.env_info.SYMBOLIZER = SYMBOLIZER
-
-          #RANLIB = os.path.join(llvm_root, "bin", "llvm-ranlib")
-          #if not os.path.exists(RANLIB):
-          #  raise Exception("Unable to find path: {}".format(RANLIB))
-          #self.env_info.RANLIB = RANLIB
-
-          # TODO: use llvm-as or clang?
-          #AS = os.path.join(llvm_root, "bin", "llvm-as")
-          #if not os.path.exists(STRIP):
-          #  raise Exception("Unable to find path: {}".format(AS))
-          #self.env_info.AS = AS
-
-          # TODO: use llvm-rc-rc or llvm-rc
-          #RC = os.path.join(llvm_root, "bin", "llvm-rc")
-          #if not os.path.exists(RC):
-          #  raise Exception("Unable to find path: {}".format(RC))
-          #self.env_info.RC = RC
-
-        # Preaload libs or add to
-        # LD_PRELOAD=.../lib/clang/9.0.1/lib/x86_64-unknown-linux-gnu/libclang_rt.asan.so
-        if (self._sanitizer != 'None' or self._has_sanitizer_option):
-          llvm_v = self.options.LLVM_CONAN_CLANG_VER
-          clang_libdir = os.path.join(llvm_root, "lib/clang/{}/lib".format(llvm_v))
-          if not os.path.exists(clang_libdir):
-            raise Exception("Unable to find path: {}".format(clang_libdir))
-          clang_libpaths = [os.path.join(clang_libdir, f) for f in os.listdir(clang_libdir)]
-          self.output.info("clang_libpaths = {}".format(str(clang_libpaths)))
-          # loop over
-          # lib/clang/9.0.1/lib/linux,
-          # lib/clang/9.0.1/lib/x86_64-unknown-linux-gnu,
-          # etc.
-          for path in clang_libpaths:
-            self.cpp_info.components["libclang_rt"].libdirs.extend([path])
-            libclang_rt_build_flags = []
-            libclang_rt_build_flags.append("-L{}".format(path))
-            libclang_rt_build_flags.append("-Wl,-rpath,{}".format(path))
-            libclang_rt_link_flags = []
-            libclang_rt_link_flags.append("-L{}".format(path))
-            libclang_rt_link_flags.append("-Wl,-rpath,{}".format(path))
-
-            self.cpp_info.components["libclang_rt"].cxxflags.extend(libclang_rt_build_flags)
-            self.cpp_info.components["libclang_rt"].cxxflags.extend(libclang_rt_build_flags)
-            self.cpp_info.components["libclang_rt"].cflags.extend(libclang_rt_build_flags)
-            self.cpp_info.components["libclang_rt"].cflags.extend(libclang_rt_build_flags)
-            self.cpp_info.components["libclang_rt"].sharedlinkflags.extend(libclang_rt_link_flags)
-            self.cpp_info.components["libclang_rt"].exelinkflags.extend(libclang_rt_link_flags)
-            self.cpp_info.components["libclang_rt"].sharedlinkflags.extend(libclang_rt_link_flags)
-            self.cpp_info.components["libclang_rt"].exelinkflags.extend(libclang_rt_link_flags)
-
-            # self.cpp_info.libdirs.extend(["{}/lib".format(path)])
-            for sanlib in ['libclang_rt.lsan.so', 'libclang_rt.asan.so', \
-                           'libclang_rt.tsan.so', 'libclang_rt.msan.so', \
-                           'libclang_rt.ubsan.so']:
-              if os.path.exists("{}/{}".format(path, sanlib)):
-                self.env_info.LD_PRELOAD.append("{}/{}".format(path, sanlib))
+          if self.options.compile_with_clang:
+            # see https://docs.conan.io/en/latest/systems_cross_building/cross_building.html
+            # and https://www.gnu.org/software/make/manual/html_node/Implicit-Variables.html
+            CXX = self._find_tool(toolchain, "clang++")
+            self.env_info.CXX = CXX
+
+            CC = self._find_tool(toolchain, "clang")
+            self.env_info.CC = CC
+
+            # TODO: use llvm-ar or llvm-lib?
+            # AR = os.path.join(llvm_root, "bin", "llvm-ar")
+            # if not os.path.exists(AR):
+            #   raise Exception("Unable to find path: {}".format(AR))
+            # self.env_info.AR = AR
+            #
+            #STRIP = os.path.join(llvm_root, "bin", "llvm-strip")
+            #if not os.path.exists(STRIP):
+            #  raise Exception("Unable to find path: {}".format(STRIP))
+            #self.env_info.STRIP = STRIP
+            #
+            # NOTE: LD is set based on `linker` option, see below
             #
+            #NM = os.path.join(llvm_root, "bin", "llvm-nm")
+            #if not os.path.exists(NM):
+            #  raise Exception("Unable to find path: {}".format(NM))
+            #self.env_info.NM = NM
+            #
+            # TODO:
+            # ADDR2LINE
+            #
+            # TODO:
+            # ELFEDIT
+            #
+            LLVM_CONFIG_PATH = self._find_tool(toolchain, "llvm-config")
+            self.env_info.LLVM_CONFIG_PATH = LLVM_CONFIG_PATH
+            #
+            # # TODO: propagate to CMAKE_OBJDUMP?
+            # OBJDUMP = os.path.join(llvm_root, "bin", "llvm-objdump")
+            # if not os.path.exists(OBJDUMP):
+            #   raise Exception("Unable to find path: {}".format(OBJDUMP))
+            # self.env_info.OBJDUMP = OBJDUMP
+
+            SYMBOLIZER = self._find_tool(toolchain, "llvm-symbolizer")
+            self.env_info.SYMBOLIZER = SYMBOLIZER
+
+            #RANLIB = os.path.join(llvm_root, "bin", "llvm-ranlib")
+            #if not os.path.exists(RANLIB):
+            #  raise Exception("Unable to find path: {}".format(RANLIB))
+            #self.env_info.RANLIB = RANLIB
+
+            # TODO: use llvm-as or clang?
+            #AS = os.path.join(llvm_root, "bin", "llvm-as")
+            #if not os.path.exists(STRIP):
+            #  raise Exception("Unable to find path: {}".format(AS))
+            #self.env_info.AS = AS
+
+            # TODO: use llvm-rc-rc or llvm-rc
+            #RC = os.path.join(llvm_root, "bin", "llvm-rc")
+            #if not os.path.exists(RC):
+            #  raise Exception("Unable to find path: {}".format(RC))
+            #self.env_info.RC = RC
+
+          if self.options.linker != 'default':
+            linker_link_flags = []
+            linker_link_flags.append("-fuse-ld={}".format(self.options.linker))
+            if self.options.linker == 'lld':
+              # NOTE: llvm-ld replaced by ld.lld
+              LD = self._find_tool(toolchain, "ld.lld")
+              self.env_info.LD = LD
+              # link using multiple threads
+              linker_link_flags.append("-Wl,--threads")
+              # speeds up debugger startup on big binaries
+              linker_link_flags.append("-Wl,--gdb-index")
+            for component in flag_components:
+              component_flags[component].add_link_flags(linker_link_flags)
+
+          if self.options.compiler_launcher != 'none':
+            LAUNCHER = tools.which(str(self.options.compiler_launcher))
+            if not LAUNCHER:
+              raise Exception("Unable to find {} in PATH".format(self.options.compiler_launcher))
+            # NOTE: requires CMake 3.17+
+            # see https://cmake.org/cmake/help/latest/envvar/CMAKE_LANG_COMPILER_LAUNCHER.html
+            self.env_info.CMAKE_C_COMPILER_LAUNCHER = LAUNCHER
+            self.env_info.CMAKE_CXX_COMPILER_LAUNCHER = LAUNCHER
+            COMPILER_CACHE_KEY = self._compiler_cache_key(toolchain, llvm_root)
+            self.env_info.LLVM_INSTALLER_COMPILER_CACHE_KEY = COMPILER_CACHE_KEY
+            if self.options.compiler_launcher == 'ccache':
+              # see https://ccache.dev/manual/latest.html#config_compiler_check
+              self.env_info.CCACHE_COMPILERCHECK = "string:{}".format(COMPILER_CACHE_KEY)
+            if self.options.compiler_launcher == 'sccache':
+              self.env_info.SCCACHE_C_CUSTOM_CACHE_BUSTER = COMPILER_CACHE_KEY
+
+          if self.options.distributed_compiler != 'none':
+            DISTRIBUTED_LAUNCHER = tools.which(str(self.options.distributed_compiler))
+            if not DISTRIBUTED_LAUNCHER:
+              raise Exception("Unable to find {} in PATH".format(self.options.distributed_compiler))
+            if self.options.compiler_launcher == 'ccache':
+              # ccache runs `distcc clang++ ...` on cache miss
+              # see https://ccache.dev/manual/latest.html#config_prefix_command
+              self.env_info.CCACHE_PREFIX = DISTRIBUTED_LAUNCHER
+            else:
+              self.env_info.CMAKE_C_COMPILER_LAUNCHER = DISTRIBUTED_LAUNCHER
+              self.env_info.CMAKE_CXX_COMPILER_LAUNCHER = DISTRIBUTED_LAUNCHER
+            if self.options.distributed_compiler == 'distcc' \
+               and str(self.options.distcc_hosts) != 'None':
+              self.env_info.DISTCC_HOSTS = str(self.options.distcc_hosts)
+            if self.options.distributed_compiler == 'icecc':
+              # remote nodes compile using same clang binary
+              self.env_info.ICECC_VERSION = self._icecc_toolchain_tarball(llvm_root)
+              self.env_info.ICECC_CC = self._find_tool(toolchain, "clang")
+              self.env_info.ICECC_CXX = self._find_tool(toolchain, "clang++")
+            if str(self.options.distributed_jobs) != 'None':
+              # see `cmake/llvm_installer_job_pools.cmake`
+              self.env_info.LLVM_INSTALLER_COMPILE_JOBS = str(self.options.distributed_jobs)
+
+          if self.options.consumer_lto != 'none':
+            lto_build_flags = []
+            lto_build_flags.append("-flto={}".format(self.options.consumer_lto))
+            lto_link_flags = []
+            lto_link_flags.append("-flto={}".format(self.options.consumer_lto))
+            if self.options.consumer_lto == 'thin':
+              thinlto_cache_dir = str(self.options.thinlto_cache_dir)
+              if thinlto_cache_dir == 'None':
+                thinlto_cache_dir = os.path.join(os.path.expanduser("~"), ".cache", self.name, "thinlto")
+              thinlto_jobs = str(self.options.thinlto_jobs)
+              if thinlto_jobs == 'None':
+                thinlto_jobs = str(tools.cpu_count())
+              # see https://lld.llvm.org/ELF/options.html
+              lto_link_flags.append("-Wl,--thinlto-cache-dir={}".format(thinlto_cache_dir))
+              lto_link_flags.append("-Wl,--thinlto-cache-policy={}".format(self.options.thinlto_cache_policy))
+              lto_link_flags.append("-Wl,--thinlto-jobs={}".format(thinlto_jobs))
+            for component in flag_components:
+              component_flags[component].add_build_flags(lto_build_flags)
+              component_flags[component].add_link_flags(lto_link_flags)
+
+          if self.options.pgo != 'off':
+            pgo_build_flags = []
+            pgo_link_flags = []
+            if self.options.pgo == 'instrument':
+              pgo_build_flags.append("-fprofile-instr-generate")
+              pgo_link_flags.append("-fprofile-instr-generate")
+              # %p - process id, %m - binary signature
+              self.env_info.LLVM_PROFILE_FILE = os.path.join(self._pgo_profile_dir, "%p-%m.profraw")
+            if self.options.pgo == 'use':
+              LLVM_PROFDATA = self._find_tool(toolchain, "llvm-profdata")
+              merged_profile = self._merge_pgo_profiles(LLVM_PROFDATA, self._pgo_profile_dir)
+              pgo_build_flags.append("-fprofile-instr-use={}".format(merged_profile))
+            for component in flag_components:
+              component_flags[component].add_build_flags(pgo_build_flags)
+              component_flags[component].add_link_flags(pgo_link_flags)
+
+          if self.options.coverage:
+            # see https://clang.llvm.org/docs/SourceBasedCodeCoverage.html
+            coverage_build_flags = []
+            coverage_build_flags.append("-fprofile-instr-generate")
+            coverage_build_flags.append("-fcoverage-mapping")
+            coverage_link_flags = []
+            coverage_link_flags.append("-fprofile-instr-generate")
+            for component in flag_components:
+              component_flags[component].add_build_flags(coverage_build_flags)
+              component_flags[component].add_link_flags(coverage_link_flags)
+            # %p - process id, %m - binary signature
+            self.env_info.LLVM_PROFILE_FILE = os.path.join(self._coverage_profile_dir, "%p-%m.profraw")
+            self.env_info.LLVM_COVERAGE_PROFILE_DIR = self._coverage_profile_dir
+            self.env_info.LLVM_COV_PATH = self._find_tool(toolchain, "llvm-cov")
+
+          if self.options.time_trace:
+            # see https://aras-p.info/blog/2019/01/16/time-trace-timeline-flame-chart-profiler-for-Clang/
+            time_trace_build_flags = []
+            time_trace_build_flags.append("-ftime-trace")
+            time_trace_build_flags.append("-ftime-trace-granularity={}".format(self.options.time_trace_granularity))
+            for component in flag_components:
+              component_flags[component].add_build_flags(time_trace_build_flags)
+
+          if self.options.debug_info != 'default':
+            debug_build_flags = []
+            debug_link_flags = []
+            if self.options.debug_info == 'full':
+              debug_build_flags.append("-g")
+            if self.options.debug_info == 'split':
+              # see https://gcc.gnu.org/wiki/DebugFission
+              debug_build_flags.append("-g")
+              debug_build_flags.append("-gsplit-dwarf")
+              # NOTE: `linker=lld` already adds `-Wl,--gdb-index`
+              if self.options.linker == 'gold':
+                debug_link_flags.append("-Wl,--gdb-index")
+              # can be used to combine `.dwo` files into `.dwp` package
+              self.env_info.LLVM_DWP_PATH = self._find_tool(toolchain, "llvm-dwp")
+            if self.options.debug_info == 'line-tables':
+              debug_build_flags.append("-gline-tables-only")
+            if self.options.debug_info == 'none':
+              debug_build_flags.append("-g0")
+            for component in flag_components:
+              component_flags[component].add_build_flags(debug_build_flags)
+              component_flags[component].add_link_flags(debug_link_flags)
+
+          # Preaload libs or add to
+          # LD_PRELOAD=.../lib/clang/9.0.1/lib/x86_64-unknown-linux-gnu/libclang_rt.asan.so
+          if (self._sanitizer != 'None' or self._has_sanitizer_option) \
+             and "libclang_rt" in requested_components:
+            if not toolchain["clang_libdir"]:
+              raise Exception("Unable to find path: {}".format(\
+                os.path.join(toolchain["clang_resource_dir"] or os.path.join(llvm_root, "lib/clang"), "lib")))
+            clang_libpaths = toolchain["clang_libpaths"]
+            self.output.info("clang_libpaths = {}".format(str(clang_libpaths)))
+            # loop over
+            # lib/clang/9.0.1/lib/linux,
+            # lib/clang/9.0.1/lib/x86_64-unknown-linux-gnu,
+            # etc.
+            for path in clang_libpaths:
+              self.cpp_info.components["libclang_rt"].libdirs.extend([path])
+              # NOTE: `-L` and `-rpath` are not passed to compiler (only to linker)
+              libclang_rt_link_flags = []
+              libclang_rt_link_flags.append("-L{}".format(path))
+              libclang_rt_link_flags.append("-Wl,-rpath,{}".format(path))
+              component_flags["libclang_rt"].add_link_flags(libclang_rt_link_flags)
+
+              # self.cpp_info.libdirs.extend(["{}/lib".format(path)])
+
+            sanitizer_runtime = self._sanitizer_runtime(toolchain)
+            self.output.info("sanitizer runtime = {}".format(sanitizer_runtime))
+            self._record_metric("sanitizer_runtime", sanitizer_runtime)
+            if self.options.sanitizer_preload == 'build':
+              self.env_info.LD_PRELOAD.append(sanitizer_runtime)
+            if self.options.sanitizer_preload == 'test':
+              self.env_info.SANITIZER_PRELOAD_PATH = sanitizer_runtime
+
+            # raw reports are written to `{sanitizer_log_dir}/asan.{pid}`, etc.
+            if self.options.sanitizer_symbolize == 'offline':
+              sanitizer_log_dir = str(self.options.sanitizer_log_dir)
+              if sanitizer_log_dir == 'None':
+                sanitizer_log_dir = os.path.join(os.path.expanduser("~"), ".cache", self.name, "sanitizer_logs")
+              # NOTE: sanitizer runtime does not create `log_path` dir,
+              # use `symbolize_sanitizer_logs.py --create-log-dir`
+              self.env_info.SANITIZER_LOG_DIR = sanitizer_log_dir
+              # list values are added to existing env. var. (separated by `:`),
+              # so own options in `ASAN_OPTIONS`, etc. are kept
+              for prefix in ["asan", "ubsan", "tsan", "msan", "lsan"]:
+                getattr(self.env_info, "{}_OPTIONS".format(prefix.upper())).extend([\
+                  "symbolize=0", "log_path={}".format(os.path.join(sanitizer_log_dir, prefix))])
+
+            # if not os.path.exists(clang_libdir):
+            #   raise ConanInvalidConfiguration(str(clang_libdir) + " must exist")
+            # clang_libpaths = []
+            # clang_libpaths.append("-lc++")
+            # self.env_info.LD_LIBRARY_PATH.extend(clang_libpaths)
+
+          if with_libcxx:
+            libcxx_link_flags = []
+            libcxx_link_flags.append("-lc++")
+            libcxx_link_flags.append("-lc++abi")
+            libcxx_link_flags.append("-lunwind")
+            libcxx_link_flags.append("-Wl,-rpath,{}/lib".format(llvm_root))
+            libcxx_link_flags.append("-stdlib=libc++")
+            component_flags["libcxx"].add_link_flags(libcxx_link_flags)
+
+          #if self.options.link_libcxx:
+          #  # we use libstdc++, not libstdc++
+          #  badflag = '-stdlib=libstdc++'
+          #  while badflag in self.env_info.LDFLAGS:
+          #    self.env_info.LDFLAGS.remove(badflag)
+          #  while badflag in self.env_info.CXXFLAGS:
+          #    self.env_info.CXXFLAGS.remove(badflag)
+          #  while badflag in self.env_info.CFLAGS:
+          #    self.env_info.CFLAGS.remove(badflag)
+
+          # TODO: do we need '-static-libstdc++' support at all?
+          # if self.options.link_libcxx:
+          #   badflag = '-static-libstdc++'
+          #   while badflag in self.env_info.LDFLAGS:
+          #     self.env_info.LDFLAGS.remove(badflag)
+          #   while badflag in self.env_info.CXXFLAGS:
+          #     self.env_info.CXXFLAGS.remove(badflag)
+          #   while badflag in self.env_info.CFLAGS:
+          #     self.env_info.CFLAGS.remove(badflag)
+
+          if (len(self._sanitizer) and self._sanitizer != 'None') \
+            or (len(str(self.options.use_sanitizer)) and self.options.use_sanitizer != "None"):
+            llvm_symbolizer = "\"{}\"".format(self._find_tool(toolchain, "llvm-symbolizer"))
+            self.env_info.UBSAN_SYMBOLIZER_PATH = llvm_symbolizer
+            self.env_info.ASAN_SYMBOLIZER_PATH = llvm_symbolizer
+            self.env_info.TSAN_SYMBOLIZER_PATH = llvm_symbolizer
+            self.env_info.MSAN_SYMBOLIZER_PATH = llvm_symbolizer
+
+          if with_libcxx:
+          #  #cxxflags.append("-resource-dir {}/lib/clang/9.0.1".format(llvm_root))
+          #  #self.cpp_info.libdirs.extend(["{}/lib".format(llvm_root)])
+            self.cpp_info.components["libcxx"].libdirs.extend(["{}/lib".format(llvm_root)])
+            # NOTE: `-lc++`, `-lc++abi`, `-lunwind` and `-stdlib=libc++` are added above
+            libcxx_build_flags = []
+            libcxx_build_flags.append("-Wno-unused-command-line-argument")
+            libcxx_build_flags.append("-Wno-error=unused-command-line-argument")
+            libcxx_build_flags.append("-nostdinc++")
+            libcxx_build_flags.append("-nodefaultlibs")
+            libcxx_build_flags.append("-lm")
+            libcxx_build_flags.append("-lc")
+            libcxx_build_flags.append("-isystem{}/include/c++/v1".format(llvm_root))
+            libcxx_build_flags.append("-isystem\"{}/include\"".format(llvm_root))
+            clang_incdir = toolchain["clang_incdir"]
+            if not clang_incdir:
+              raise Exception("Unable to find path: {}".format(\
+                os.path.join(toolchain["clang_resource_dir"] or os.path.join(llvm_root, "lib/clang"), "include")))
+            libcxx_build_flags.append("-isystem{}".format(clang_incdir))
+            libcxx_build_flags.append("-L{}/lib".format(llvm_root))
+            component_flags["libcxx"].add_link_flags(libcxx_build_flags)
+
+           # if self._libcxx in ["libstdc++", "libstdc++11"]:
+           #     self.cpp_info.libs.append("stdc++")
+           # elif "clang" in str(self.settings.compiler) and self._libcxx == "libc++":
+           #     self.cpp_info.libs.append("c++")
+           # elif self._libcxx in ["c++_static", "c++_shared"]:
+           #     self.cpp_info.libs.extend([self._libcxx, "c++abi"])
+
+          if self.options.toolchain_file != 'none':
+            toolchain_file = self._generate_toolchain_file(toolchain, \
+              component_flags["libcxx"].exelinkflags if with_libcxx else [])
+            self.output.info("toolchain file: {}".format(toolchain_file))
+            self._record_metric("toolchain_file", toolchain_file)
+            self.env_info.LLVM_INSTALLER_TOOLCHAIN_FILE = toolchain_file
+            if self.options.toolchain_file == 'conan':
+              self.env_info.CONAN_CMAKE_TOOLCHAIN_FILE = toolchain_file
+
+          for component, flags in component_flags.items():
+            # do not create components that were not requested
+            if component in self.cpp_info.components:
+              flags.apply(self.cpp_info.components[component])
+
+          #self.cpp_info.cxxflags.extend(common_build_flags)
+          #self.cpp_info.cxxflags.extend(cxxflags)
+          #self.cpp_info.cflags.extend(common_build_flags)
+          #self.cpp_info.cflags.extend(cflags)
+          #self.cpp_info.sharedlinkflags.extend(common_link_flags)
+          #self.cpp_info.exelinkflags.extend(common_link_flags)
+          #self.cpp_info.sharedlinkflags.extend(ldflags)
+          #self.cpp_info.exelinkflags.extend(ldflags)
 
-          # if not os.path.exists(clang_libdir):
-          #   raise ConanInvalidConfiguration(str(clang_libdir) + " must exist")
-          # clang_libpaths = []
-          # clang_libpaths.append("-lc++")
-          # self.env_info.LD_LIBRARY_PATH.extend(clang_libpaths)
-
-        if self.options.link_libcxx:
-          libcxx_link_flags = []
-          libcxx_link_flags.append("-lc++")
-          libcxx_link_flags.append("-lc++abi")
-          libcxx_link_flags.append("-lunwind")
-          libcxx_link_flags.append("-Wl,-rpath,{}/lib".format(llvm_root))
-          libcxx_link_flags.append("-stdlib=libc++")
-          self.cpp_info.components["libcxx"].sharedlinkflags.extend(libcxx_link_flags)
-          self.cpp_info.components["libcxx"].exelinkflags.extend(libcxx_link_flags)
-
-        #if self.options.link_libcxx:
-        #  # we use libstdc++, not libstdc++
-        #  badflag = '-stdlib=libstdc++'
-        #  while badflag in self.env_info.LDFLAGS:
-        #    self.env_info.LDFLAGS.remove(badflag)
-        #  while badflag in self.env_info.CXXFLAGS:
-        #    self.env_info.CXXFLAGS.remove(badflag)
-        #  while badflag in self.env_info.CFLAGS:
-        #    self.env_info.CFLAGS.remove(badflag)
-
-        # TODO: do we need '-static-libstdc++' support at all?
-        # if self.options.link_libcxx:
-        #   badflag = '-static-libstdc++'
-        #   while badflag in self.env_info.LDFLAGS:
-        #     self.env_info.LDFLAGS.remove(badflag)
-        #   while badflag in self.env_info.CXXFLAGS:
-        #     self.env_info.CXXFLAGS.remove(badflag)
-        #   while badflag in self.env_info.CFLAGS:
-        #     self.env_info.CFLAGS.remove(badflag)
-
-        if (len(self._sanitizer) and self._sanitizer != 'None') \
-          or (len(str(self.options.use_sanitizer)) and self.options.use_sanitizer != "None"):
-          llvm_symbolizer = "\"{}/bin/llvm-symbolizer\"".format(llvm_root)
-          if not os.path.exists(llvm_symbolizer):
-            raise Exception("Unable to find path: {}".format(llvm_symbolizer))
-          self.env_info.UBSAN_SYMBOLIZER_PATH = llvm_symbolizer
-          self.env_info.ASAN_SYMBOLIZER_PATH = llvm_symbolizer
-          self.env_info.TSAN_SYMBOLIZER_PATH = llvm_symbolizer
-          self.env_info.MSAN_SYMBOLIZER_PATH = llvm_symbolizer
-
-        if self.options.link_libcxx:
-        #  #cxxflags.append("-resource-dir {}/lib/clang/9.0.1".format(llvm_root))
-        #  #self.cpp_info.libdirs.extend(["{}/lib".format(llvm_root)])
-          self.cpp_info.components["libcxx"].libdirs.extend(["{}/lib".format(llvm_root)])
-          libcxx_link_flags = []
-          libcxx_link_flags.append("-stdlib=libc++")
-          self.cpp_info.components["libcxx"].sharedlinkflags.extend(libcxx_link_flags)
-          self.cpp_info.components["libcxx"].exelinkflags.extend(libcxx_link_flags)
-          libcxx_build_flags = []
-          libcxx_build_flags.append("-Wno-unused-command-line-argument")
-          libcxx_build_flags.append("-Wno-error=unused-command-line-argument")
-          libcxx_build_flags.append("-nostdinc++")
-          libcxx_build_flags.append("-nodefaultlibs")
-          libcxx_build_flags.append("-lc++abi")
-          libcxx_build_flags.append("-lunwind")
-          libcxx_build_flags.append("-lc++")
-          libcxx_build_flags.append("-lm")
-          libcxx_build_flags.append("-lc")
-          libcxx_build_flags.append("-stdlib=libc++")
-          libcxx_build_flags.append("-isystem{}/include/c++/v1".format(llvm_root))
-          libcxx_build_flags.append("-isystem\"{}/include\"".format(llvm_root))
-          llvm_v = self.options.LLVM_CONAN_CLANG_VER
-          clang_incdir = os.path.join(llvm_root, "lib/clang/{}/include".format(llvm_v))
-          if not os.path.exists(clang_incdir):
-            raise Exception("Unable to find path: {}".format(clang_incdir))
-          libcxx_build_flags.append("-isystem{}".format(clang_incdir))
-          libcxx_build_flags.append("-L{}/lib".format(llvm_root))
-          libcxx_build_flags.append("-Wl,-rpath,{}/lib".format(llvm_root))
-          self.cpp_info.components["libcxx"].sharedlinkflags.extend(libcxx_build_flags)
-          self.cpp_info.components["libcxx"].exelinkflags.extend(libcxx_build_flags)
-
-         # if self._libcxx in ["libstdc++", "libstdc++11"]:
-         #     self.cpp_info.libs.append("stdc++")
-         # elif "clang" in str(self.settings.compiler) and self._libcxx == "libc++":
-         #     self.cpp_info.libs.append("c++")
-         # elif self._libcxx in ["c++_static", "c++_shared"]:
-         #     self.cpp_info.libs.extend([self._libcxx, "c++abi"])
-
-        #self.cpp_info.cxxflags.extend(common_build_flags)
-        #self.cpp_info.cxxflags.extend(cxxflags)
-        #self.cpp_info.cflags.extend(common_build_flags)
-        #self.cpp_info.cflags.extend(cflags)
-        #self.cpp_info.sharedlinkflags.extend(common_link_flags)
-        #self.cpp_info.exelinkflags.extend(common_link_flags)
-        #self.cpp_info.sharedlinkflags.extend(ldflags)
-        #self.cpp_info.exelinkflags.extend(ldflags)
-
-        # NOTE: collects all flags, must be at the end
-        #self.env_info.CXXFLAGS = " ".join(self.cpp_info.cxxflags)
-        #self.env_info.LDFLAGS = " ".join(self.cpp_info.sharedlinkflags)
+          # NOTE: collects all flags, must be at the end
+          #self.env_info.CXXFLAGS = " ".join(self.cpp_info.cxxflags)
+          #self.env_info.LDFLAGS = " ".join(self.cpp_info.sharedlinkflags)
@@ -0,0 +1,163 @@
+# Helpers shared by scripts that run llvm tools over `compile_commands.json`
+# i.e. `run_clang_tidy.py`.
+#
+# NOTE: `compile_commands.json` can be generated using
+# `cmake -DCMAKE_EXPORT_COMPILE_COMMANDS=ON`
+import hashlib
+import json
+import os
+import re
+import shlex
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+COMPILE_DB_NAME = "compile_commands.json"
+
+def find_compile_db(path):
+    if os.path.isdir(path):
+        path = os.path.join(path, COMPILE_DB_NAME)
+    if not os.path.exists(path):
+        raise Exception("Unable to find path: {}".format(path))
+    return os.path.abspath(path)
+
+# Returns list of entries with absolute `file` path and `arguments` list
+# (`command` string is split using shell rules).
+# `file_filter` is regex matched against absolute file path.
+def load_compile_db(path, file_filter=None):
+    with open(find_compile_db(path), "r") as f:
+        raw_entries = json.load(f)
+    pattern = re.compile(file_filter) if file_filter else None
+    entries = []
+    seen = set()
+    for raw in raw_entries:
+        directory = raw["directory"]
+        source = os.path.normpath(os.path.join(directory, raw["file"]))
+        if pattern and not pattern.search(source):
+            continue
+        # same file may be compiled multiple times (i.e. PIC and non-PIC objects)
+        if source in seen:
+            continue
+        seen.add(source)
+        if "arguments" in raw:
+            arguments = list(raw["arguments"])
+        else:
+            arguments = shlex.split(raw["command"])
+        entries.append({
+            "file": source,
+            "directory": directory,
+            "arguments": arguments
+        })
+    return entries
+
+# Compiler flags without compiler path, source file and output file
+# i.e. `clang++ -Ifoo -c a.cpp -o a.o` -> `-Ifoo`
+def compile_flags(entry):
+    flags = []
+    arguments = entry["arguments"][1:]
+    skip_next = False
+    for arg in arguments:
+        if skip_next:
+            skip_next = False
+            continue
+        if arg == "-o":
+            skip_next = True
+            continue
+        if arg == "-c" or arg.startswith("-o"):
+            continue
+        if os.path.normpath(os.path.join(entry["directory"], arg)) == entry["file"]:
+            continue
+        flags.append(arg)
+    return flags
+
+def hash_file(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+# Hash of `-E` output, or `None` if source can not be preprocessed,
+# so changes in any included header change the hash
+def preprocessed_hash(entry, flags):
+    command = [entry["arguments"][0]] + flags + ["-E", entry["file"]]
+    process = subprocess.Popen(command, cwd=entry["directory"],
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    hasher = hashlib.sha256()
+    for chunk in iter(lambda: process.stdout.read(1 << 20), b""):
+        hasher.update(chunk)
+    process.stdout.close()
+    if process.wait() != 0:
+        return None
+    return hasher.hexdigest()
+
+def hash_parts(*parts):
+    hasher = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, str):
+            part = json.dumps(part, sort_keys=True)
+        hasher.update(part.encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+# Identifies version of a tool, so cached results are dropped after tool update
+def tool_signature(path):
+    try:
+        stat = os.stat(path)
+        return "{}:{}:{}".format(os.path.realpath(path), stat.st_size, stat.st_mtime)
+    except OSError:
+        return path
+
+# Finds nearest config file (i.e. `.clang-tidy`) in parent directories
+def find_config(start_dir, name):
+    directory = os.path.abspath(start_dir)
+    while True:
+        candidate = os.path.join(directory, name)
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+# Stores results as `<cache_dir>/<key[:2]>/<key>.json`
+class ResultCache(object):
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def get(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), "r") as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def put(self, key, value):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to temporary file first, so parallel runs never see partial results
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+
+def default_jobs():
+    return os.cpu_count() or 1
+
+# Runs `function(item)` for each item using `jobs` workers,
+# yields `(item, result)` in order of completion.
+# NOTE: workers are threads, but each of them waits for a separate
+# tool process, so tools run in parallel on all cores.
+def run_parallel(function, items, jobs=None):
+    with ThreadPoolExecutor(max_workers=jobs or default_jobs()) as executor:
+        futures = dict((executor.submit(function, item), item) for item in items)
+        for future in as_completed(futures):
+            yield futures[future], future.result()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# Source-based code coverage helper, see
+# https://clang.llvm.org/docs/SourceBasedCodeCoverage.html
+#
+# Raw profiles are merged in one `llvm-profdata merge` call (parallel, sparse),
+# previous merged profile is merged too, so `--remove-raw` keeps merges incremental.
+# Reports are exported by `llvm-cov` in parallel (one process per binary).
+#
+# USAGE
+# 1. build with `-o llvm_9_installer:coverage=True` and run tests,
+#    raw profiles will be stored in `--profile-dir` (`LLVM_COVERAGE_PROFILE_DIR` env. var.)
+# 2. merge raw profiles:
+#    llvm_coverage.py merge --remove-raw
+# 3. export reports (`<binary>.lcov` and `<binary>.txt`) for tested binaries:
+#    llvm_coverage.py report --output-dir coverage ./bin/test_package ./bin/other_test
+import argparse
+import os
+import subprocess
+import sys
+
+import compile_db
+import llvm_pgo
+
+MERGED_PROFILE_NAME = "coverage.profdata"
+
+def default_profile_dir():
+    return os.getenv("LLVM_COVERAGE_PROFILE_DIR")
+
+def merge(profile_dir, output, jobs, remove_raw):
+    raw_profiles = llvm_pgo.find_raw_profiles(profile_dir)
+    if not raw_profiles:
+        if os.path.exists(output):
+            return output
+        raise Exception("Unable to find profiles in: {}".format(profile_dir))
+    inputs = list(raw_profiles)
+    if os.path.exists(output):
+        inputs.append(output)
+    merged = output + ".tmp"
+    llvm_pgo.merge_profiles(inputs, merged, jobs=jobs, sparse=True)
+    os.replace(merged, output)
+    # raw profiles are already part of merged profile
+    if remove_raw:
+        for path in raw_profiles:
+            os.remove(path)
+    return output
+
+class CoverageReporter(object):
+    def __init__(self, args):
+        self.args = args
+        self.llvm_cov = llvm_pgo.find_llvm_tool("llvm-cov")
+
+    def command(self, action, binary):
+        command = [self.llvm_cov, action, binary, "-instr-profile={}".format(self.args.profile)]
+        if self.args.ignore_filename_regex:
+            command.append("-ignore-filename-regex={}".format(self.args.ignore_filename_regex))
+        return command
+
+    def run(self, binary):
+        name = os.path.basename(binary)
+        outputs = [
+          (self.command("export", binary) + ["-format=lcov"], name + ".lcov"),
+          (self.command("report", binary), name + ".txt")
+        ]
+        returncode = 0
+        for command, output in outputs:
+            with open(os.path.join(self.args.output_dir, output), "w") as f:
+                returncode = subprocess.call(command, stdout=f) or returncode
+        return returncode
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Source-based code coverage: merge profiles, export reports")
+    subparsers = parser.add_subparsers(dest="action")
+    merge_parser = subparsers.add_parser("merge", help="merge raw profiles")
+    merge_parser.add_argument("--profile-dir", default=default_profile_dir(),
+                              help="defaults to LLVM_COVERAGE_PROFILE_DIR env. var.")
+    merge_parser.add_argument("--output", default=None,
+                              help="defaults to {} in profile dir".format(MERGED_PROFILE_NAME))
+    merge_parser.add_argument("-j", "--jobs", type=int, default=compile_db.default_jobs())
+    merge_parser.add_argument("--remove-raw", action="store_true",
+                              help="remove raw profiles after merge")
+    report_parser = subparsers.add_parser("report", help="export lcov and text reports per binary")
+    report_parser.add_argument("--profile", default=None,
+                               help="merged profile, defaults to {} in profile dir".format(MERGED_PROFILE_NAME))
+    report_parser.add_argument("--profile-dir", default=default_profile_dir(),
+                               help="defaults to LLVM_COVERAGE_PROFILE_DIR env. var.")
+    report_parser.add_argument("--output-dir", default="coverage")
+    report_parser.add_argument("--ignore-filename-regex", default=None)
+    report_parser.add_argument("-j", "--jobs", type=int, default=compile_db.default_jobs())
+    report_parser.add_argument("binaries", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.action == "merge":
+        if not args.profile_dir:
+            parser.error("--profile-dir is required (or LLVM_COVERAGE_PROFILE_DIR env. var.)")
+        output = args.output or os.path.join(args.profile_dir, MERGED_PROFILE_NAME)
+        print(merge(args.profile_dir, output, args.jobs, args.remove_raw))
+        return 0
+
+    if args.action == "report":
+        if not args.profile:
+            if not args.profile_dir:
+                parser.error("--profile or --profile-dir is required")
+            args.profile = os.path.join(args.profile_dir, MERGED_PROFILE_NAME)
+        if not os.path.exists(args.profile):
+            raise Exception("Unable to find path: {}".format(args.profile))
+        if not os.path.exists(args.output_dir):
+            os.makedirs(args.output_dir)
+        reporter = CoverageReporter(args)
+        failed = []
+        for binary, returncode in compile_db.run_parallel(reporter.run, args.binaries, args.jobs):
+            if returncode != 0:
+                failed.append(binary)
+        for binary in failed:
+            sys.stderr.write("llvm-cov failed for {}\n".format(binary))
+        return 1 if failed else 0
+
+    parser.print_help()
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
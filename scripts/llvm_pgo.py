@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# Profile-guided optimization helper, see
+# https://clang.llvm.org/docs/UsersManual.html#profiling-with-instrumentation
+#
+# USAGE
+# 1. build with `-o llvm_9_installer:pgo=instrument`
+# 2. run workload, raw profiles will be stored in `--profile-dir`:
+#    llvm_pgo.py run --profile-dir ~/.cache/llvm_9_installer/pgo -- ./bin/test_package --version
+# 3. merge raw profiles (optional, `pgo=use` merges automatically):
+#    llvm_pgo.py merge --profile-dir ~/.cache/llvm_9_installer/pgo
+# 4. build with `-o llvm_9_installer:pgo=use`
+import argparse
+import glob
+import os
+import subprocess
+import sys
+
+# same pattern as `LLVM_PROFILE_FILE` set by llvm_xxx_installer
+# %p - process id, %m - binary signature
+PROFILE_FILE_PATTERN = "%p-%m.profraw"
+
+MERGED_PROFILE_NAME = "merged.profdata"
+
+def find_llvm_tool(name):
+    # NOTE: llvm_xxx_installer sets env. vars like `LLVM_PROFDATA_PATH`
+    envvar = "{}_PATH".format(name.upper().replace("-", "_"))
+    return os.getenv(envvar, name)
+
+def find_raw_profiles(profile_dir):
+    return sorted(glob.glob(os.path.join(profile_dir, "*.profraw")))
+
+# Uses response file (list of input files)
+# to merge thousands of profiles without hitting command line limits.
+def merge_profiles(inputs, output, jobs=None, sparse=False, llvm_profdata=None):
+    if not inputs:
+        raise Exception("Nothing to merge into {}".format(output))
+    llvm_profdata = llvm_profdata or find_llvm_tool("llvm-profdata")
+    input_files = output + ".inputs"
+    with open(input_files, "w") as f:
+        f.write("\n".join(inputs))
+    command = [llvm_profdata, "merge", "-output={}".format(output),
+               "-input-files={}".format(input_files)]
+    if jobs:
+        command.append("-num-threads={}".format(jobs))
+    if sparse:
+        command.append("-sparse")
+    try:
+        subprocess.check_call(command)
+    finally:
+        os.remove(input_files)
+    return output
+
+def run_workload(profile_dir, command):
+    if not os.path.exists(profile_dir):
+        os.makedirs(profile_dir)
+    env = dict(os.environ)
+    env["LLVM_PROFILE_FILE"] = os.path.join(profile_dir, PROFILE_FILE_PATTERN)
+    return subprocess.call(command, env=env)
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="PGO helper: instrument -> merge -> use")
+    subparsers = parser.add_subparsers(dest="action")
+    run_parser = subparsers.add_parser("run", help="run instrumented workload")
+    run_parser.add_argument("--profile-dir", required=True)
+    run_parser.add_argument("command", nargs=argparse.REMAINDER)
+    merge_parser = subparsers.add_parser("merge", help="merge raw profiles")
+    merge_parser.add_argument("--profile-dir", required=True)
+    merge_parser.add_argument("--output", default=None,
+                              help="defaults to {} in profile dir".format(MERGED_PROFILE_NAME))
+    merge_parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    if args.action == "run":
+        command = args.command
+        if command and command[0] == "--":
+            command = command[1:]
+        if not command:
+            parser.error("workload command is required")
+        return run_workload(args.profile_dir, command)
+
+    if args.action == "merge":
+        output = args.output or os.path.join(args.profile_dir, MERGED_PROFILE_NAME)
+        merge_profiles(find_raw_profiles(args.profile_dir), output, jobs=args.jobs)
+        print(output)
+        return 0
+
+    parser.print_help()
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
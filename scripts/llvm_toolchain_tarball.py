@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# Creates relocatable tarball with bundled clang for distributed compilation,
+# so remote nodes compile using exactly same compiler binaries and headers.
+#
+# `icecc` - icecc environment (`usr/bin/clang`, resource dir, shared libs),
+# path to tarball must be passed to `ICECC_VERSION`.
+# Uses `icecc-create-env` if it can be found in PATH.
+# `distcc` - keeps absolute paths of `llvm_root`,
+# extract tarball on each distcc host using `tar -xzf clang_distcc.tar.gz -C /`
+#
+# NOTE: tarball is reproducible (same mtime and owner of all files),
+# so same compiler always gives same icecc environment hash.
+#
+# USAGE
+# llvm_toolchain_tarball.py --format distcc --output clang_distcc.tar.gz
+# llvm_toolchain_tarball.py --format icecc --output-dir ~/.cache/llvm_9_installer/icecc
+import argparse
+import contextlib
+import glob
+import gzip
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+# i.e. `libz.so.1 => /lib/x86_64-linux-gnu/libz.so.1 (0x00007f...)`
+# or `/lib64/ld-linux-x86-64.so.2 (0x00007f...)`
+LDD_RE = re.compile(r"(?:=>\s*)?(/\S+)\s+\(0x[0-9a-f]+\)")
+
+def find_llvm_root(llvm_root):
+    llvm_root = llvm_root or os.getenv("LLVM_NORMPATH")
+    if not llvm_root:
+        raise Exception("Unable to find llvm root, use --llvm-root or LLVM_NORMPATH env. var.")
+    if not os.path.exists(os.path.join(llvm_root, "bin", "clang")):
+        raise Exception("Unable to find path: {}".format(os.path.join(llvm_root, "bin", "clang")))
+    return os.path.abspath(llvm_root)
+
+# i.e. `llvm_root/lib/clang/9.0.1`
+def find_resource_dir(llvm_root):
+    clang = os.path.join(llvm_root, "bin", "clang")
+    try:
+        output = subprocess.check_output([clang, "-print-resource-dir"], universal_newlines=True).strip()
+        if os.path.isdir(output):
+            return os.path.realpath(output)
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    candidates = sorted(glob.glob(os.path.join(llvm_root, "lib", "clang", "*")))
+    if not candidates:
+        raise Exception("Unable to find path: {}".format(os.path.join(llvm_root, "lib", "clang")))
+    return os.path.realpath(candidates[-1])
+
+def shared_libs(binary):
+    try:
+        output = subprocess.check_output(["ldd", binary], universal_newlines=True,
+                                         stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        # i.e. statically linked
+        return []
+    libs = []
+    for line in output.splitlines():
+        match = LDD_RE.search(line)
+        if match and os.path.exists(match.group(1)):
+            libs.append(match.group(1))
+    return libs
+
+# `w:gz` mode stores current time in gzip header,
+# so tarball hash would change on each run
+@contextlib.contextmanager
+def open_tarball(output):
+    with open(output, "wb") as f:
+        with gzip.GzipFile(filename="", mode="wb", fileobj=f, mtime=0) as compressed:
+            with tarfile.open(fileobj=compressed, mode="w") as tar:
+                yield tar
+
+def reproducible(tarinfo):
+    tarinfo.mtime = 0
+    tarinfo.uid = tarinfo.gid = 0
+    tarinfo.uname = tarinfo.gname = "root"
+    return tarinfo
+
+# Adds file (resolving symlinks), `arcname` is path inside tarball
+def add_file(tar, path, arcname):
+    tar.add(os.path.realpath(path), arcname=arcname, recursive=False, filter=reproducible)
+
+def add_tree(tar, path, arcname):
+    tar.add(path, arcname=arcname, recursive=True, filter=reproducible)
+
+def add_symlink(tar, target, arcname):
+    info = reproducible(tarfile.TarInfo(arcname))
+    info.type = tarfile.SYMTYPE
+    info.linkname = target
+    tar.addfile(info)
+
+# Files are stored under their absolute paths (without leading `/`)
+def create_distcc(llvm_root, output):
+    resource_dir = find_resource_dir(llvm_root)
+    clang = os.path.realpath(os.path.join(llvm_root, "bin", "clang"))
+    with open_tarball(output) as tar:
+        # i.e. `bin/clang -> clang-9`
+        if clang != os.path.join(llvm_root, "bin", "clang"):
+            add_file(tar, clang, os.path.relpath(clang, "/"))
+        for tool in ["clang", "clang++"]:
+            path = os.path.join(llvm_root, "bin", tool)
+            if os.path.islink(path):
+                add_symlink(tar, os.readlink(path), os.path.relpath(path, "/"))
+            else:
+                add_file(tar, path, os.path.relpath(path, "/"))
+        add_tree(tar, os.path.join(resource_dir, "include"),
+                 os.path.relpath(os.path.join(resource_dir, "include"), "/"))
+        libcxx_include = os.path.join(llvm_root, "include", "c++", "v1")
+        if os.path.isdir(libcxx_include):
+            add_tree(tar, libcxx_include, os.path.relpath(libcxx_include, "/"))
+        # i.e. `libLLVM.so` if clang is linked with shared llvm libs
+        for lib in shared_libs(clang):
+            if os.path.realpath(lib).startswith(os.path.realpath(llvm_root) + os.sep):
+                add_file(tar, lib, os.path.relpath(lib, "/"))
+    return output
+
+# Same layout as `icecc-create-env --clang`, clang is `usr/bin/clang`
+# so resource dir is `usr/lib/clang/{clang_version}`
+def create_icecc_env(llvm_root, output):
+    resource_dir = find_resource_dir(llvm_root)
+    clang = os.path.realpath(os.path.join(llvm_root, "bin", "clang"))
+    with open_tarball(output) as tar:
+        add_file(tar, clang, "usr/bin/clang")
+        add_symlink(tar, "clang", "usr/bin/clang++")
+        assembler = shutil.which("as")
+        if assembler:
+            add_file(tar, assembler, "usr/bin/as")
+        add_tree(tar, os.path.join(resource_dir, "include"),
+                 "usr/lib/clang/{}/include".format(os.path.basename(resource_dir)))
+        seen = set()
+        for binary in [clang] + ([assembler] if assembler else []):
+            for lib in shared_libs(binary):
+                if lib not in seen:
+                    seen.add(lib)
+                    add_file(tar, lib, os.path.relpath(lib, "/"))
+        info = reproducible(tarfile.TarInfo("etc/ld.so.conf"))
+        tar.addfile(info)
+    return output
+
+def hash_file(path):
+    hasher = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+# icecc environment is named by hash of its content
+def create_icecc(llvm_root, output_dir):
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    clang = os.path.realpath(os.path.join(llvm_root, "bin", "clang"))
+    work_dir = tempfile.mkdtemp(dir=output_dir)
+    try:
+        if shutil.which("icecc-create-env"):
+            subprocess.check_call(["icecc-create-env", "--clang", clang], cwd=work_dir,
+                                  stdout=sys.stderr)
+            created = glob.glob(os.path.join(work_dir, "*.tar.gz"))
+            if not created:
+                raise Exception("icecc-create-env did not create environment")
+            tarball = created[0]
+        else:
+            tarball = create_icecc_env(llvm_root, os.path.join(work_dir, "env.tar.gz"))
+        output = os.path.join(output_dir, hash_file(tarball) + ".tar.gz")
+        os.replace(tarball, output)
+    finally:
+        shutil.rmtree(work_dir)
+    return output
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Creates tarball with bundled clang for distcc or icecc")
+    parser.add_argument("--llvm-root", default=None,
+                        help="defaults to LLVM_NORMPATH env. var.")
+    parser.add_argument("--format", choices=["distcc", "icecc"], required=True)
+    parser.add_argument("--output", default="clang_distcc.tar.gz",
+                        help="tarball path (distcc)")
+    parser.add_argument("--output-dir", default=".",
+                        help="tarball is named by its hash (icecc)")
+    args = parser.parse_args(argv)
+
+    llvm_root = find_llvm_root(args.llvm_root)
+    if args.format == "distcc":
+        output = create_distcc(llvm_root, args.output)
+    else:
+        output = create_icecc(llvm_root, args.output_dir)
+    # path of created tarball, i.e. for `ICECC_VERSION`
+    sys.stdout.write(os.path.abspath(output) + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# Runs clang static analyzer (`clang --analyze`) over `compile_commands.json` in parallel.
+#
+# Results (plist per translation unit) are cached, cache key depends on
+# preprocessed source (so changes in any included header invalidate result),
+# compile flags, analyzer args and clang binary,
+# so re-runs analyze only changed translation units.
+#
+# `--ctu` enables cross translation unit analysis:
+# AST of each translation unit (`-emit-ast`) and `clang-extdef-mapping` index
+# are stored in `--ctu-dir` and re-created only for changed translation units.
+# CTU results also depend on index content and on source of each indexed translation unit
+# (imported definitions), so change in any indexed translation unit invalidates CTU results.
+#
+# USAGE
+# run_clang_analyzer.py -p build --output-dir analyzer-results
+# run_clang_analyzer.py -p build --ctu -- -Xanalyzer -analyzer-checker=alpha.core
+import argparse
+import os
+import plistlib
+import subprocess
+import sys
+
+import compile_db
+
+CTU_INDEX_NAME = "externalDefMap.txt"
+
+# i.e. `build/src/a.cpp` -> `a.cpp_1b2c3d4e5f60.plist`
+def result_name(source, extension):
+    return "{}_{}{}".format(os.path.basename(source), compile_db.hash_parts(source)[:12], extension)
+
+# Returns list of `file:line:col: warning: description [check_name]`
+def plist_diagnostics(plist):
+    if not plist:
+        return []
+    try:
+        data = plistlib.loads(plist.encode("utf-8"))
+    except Exception:
+        return []
+    files = data.get("files", [])
+    diagnostics = []
+    for diagnostic in data.get("diagnostics", []):
+        location = diagnostic.get("location", {})
+        index = location.get("file", 0)
+        path = files[index] if index < len(files) else "?"
+        diagnostics.append("{}:{}:{}: warning: {} [{}]".format(
+            path, location.get("line", 0), location.get("col", 0),
+            diagnostic.get("description", ""), diagnostic.get("check_name", "")))
+    return diagnostics
+
+def run_command(command, cwd):
+    process = subprocess.Popen(command, cwd=cwd,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               universal_newlines=True)
+    output, _ = process.communicate()
+    return process.returncode, output
+
+# AST files and `clang-extdef-mapping` index, see
+# https://clang.llvm.org/docs/analyzer/user-docs/CrossTranslationUnit.html
+class CtuIndex(object):
+    def __init__(self, args, cache):
+        self.args = args
+        self.cache = cache
+        self.ctu_dir = os.path.abspath(args.ctu_dir)
+        self.tool_signature = compile_db.tool_signature(args.extdef_mapping)
+        self.clang_signature = compile_db.tool_signature(args.clang)
+        self.index_hash = ""
+
+    # path inside `ctu_dir`, index stores paths relative to `ctu_dir`
+    @staticmethod
+    def ast_name(source):
+        return os.path.join("ast", os.path.relpath(source, "/") + ".ast")
+
+    # Re-creates AST only if clang, source hash or flags changed (hash is stored near AST)
+    def emit_ast(self, entry, flags, source_hash):
+        ast_path = os.path.join(self.ctu_dir, self.ast_name(entry["file"]))
+        hash_path = ast_path + ".hash"
+        ast_hash = None
+        if source_hash:
+            ast_hash = compile_db.hash_parts(
+                "clang-emit-ast",
+                self.clang_signature,
+                source_hash,
+                flags)
+        if ast_hash and os.path.exists(ast_path) and os.path.exists(hash_path):
+            with open(hash_path, "r") as f:
+                if f.read() == ast_hash:
+                    return True
+        if not os.path.exists(os.path.dirname(ast_path)):
+            os.makedirs(os.path.dirname(ast_path), exist_ok=True)
+        command = [self.args.clang] + flags + ["-emit-ast", "-o", ast_path, entry["file"]]
+        returncode, output = run_command(command, entry["directory"])
+        if returncode != 0:
+            sys.stderr.write(output)
+            return False
+        if ast_hash:
+            with open(hash_path, "w") as f:
+                f.write(ast_hash)
+        return True
+
+    # Returns list of `USR source` lines
+    def extdef_mapping(self, entry, flags, source_hash):
+        key = None
+        if source_hash:
+            key = compile_db.hash_parts(
+                "clang-extdef-mapping",
+                self.tool_signature,
+                source_hash,
+                flags)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        command = [self.args.extdef_mapping, "-p", self.args.build_path, entry["file"]]
+        process = subprocess.Popen(command, cwd=entry["directory"],
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                   universal_newlines=True)
+        output, _ = process.communicate()
+        if process.returncode != 0:
+            return []
+        lines = [line.strip() for line in output.splitlines() if line.strip()]
+        if key:
+            self.cache.put(key, lines)
+        return lines
+
+    def run(self, item):
+        entry, source_hash = item
+        flags = compile_db.compile_flags(entry)
+        if not self.emit_ast(entry, flags, source_hash):
+            return []
+        return self.extdef_mapping(entry, flags, source_hash)
+
+    # Index is written only if content changed
+    def build(self, entries, source_hashes):
+        sources = set(entry["file"] for entry in entries)
+        definitions = {}
+        items = [(entry, source_hashes.get(entry["file"])) for entry in entries]
+        for (entry, _), lines in compile_db.run_parallel(self.run, items, self.args.jobs):
+            for line in lines:
+                usr, _, source = line.partition(" ")
+                source = os.path.normpath(os.path.join(entry["directory"], source))
+                if source in sources:
+                    definitions.setdefault(usr, set()).add(self.ast_name(source))
+        # same definition in multiple translation units (i.e. inline functions) is ambiguous
+        index = "".join("{} {}\n".format(usr, next(iter(asts)))
+                        for usr, asts in sorted(definitions.items()) if len(asts) == 1)
+        indexed_asts = set(next(iter(asts)) for asts in definitions.values() if len(asts) == 1)
+        index_path = os.path.join(self.ctu_dir, CTU_INDEX_NAME)
+        previous = None
+        if os.path.exists(index_path):
+            with open(index_path, "r") as f:
+                previous = f.read()
+        if index != previous:
+            with open(index_path, "w") as f:
+                f.write(index)
+        # function bodies are imported from ASTs, but index does not change if body changes
+        self.index_hash = compile_db.hash_parts(
+            index,
+            sorted((self.ast_name(entry["file"]), source_hashes.get(entry["file"]) or "")
+                   for entry in entries if self.ast_name(entry["file"]) in indexed_asts))
+        return index_path
+
+    def analyzer_args(self):
+        return [
+          "-Xclang", "-analyzer-config", "-Xclang", "experimental-enable-naive-ctu-analysis=true",
+          "-Xclang", "-analyzer-config", "-Xclang", "ctu-dir={}".format(self.ctu_dir),
+          "-Xclang", "-analyzer-config", "-Xclang", "ctu-index-name={}".format(CTU_INDEX_NAME)
+        ]
+
+class ClangAnalyzerRunner(object):
+    def __init__(self, args):
+        self.args = args
+        self.cache = compile_db.ResultCache(None if args.no_cache else args.cache_dir)
+        self.tool_signature = compile_db.tool_signature(args.clang)
+        self.ctu = CtuIndex(args, self.cache) if args.ctu else None
+
+    def source_hash(self, entry):
+        return compile_db.preprocessed_hash(entry, compile_db.compile_flags(entry))
+
+    def analyzer_args(self):
+        return (self.ctu.analyzer_args() if self.ctu else []) + self.args.analyzer_args
+
+    def run(self, item):
+        entry, source_hash = item
+        flags = compile_db.compile_flags(entry)
+        plist_path = os.path.join(self.args.output_dir, result_name(entry["file"], ".plist"))
+        key = None
+        if source_hash:
+            key = compile_db.hash_parts(
+                "clang-analyzer",
+                self.tool_signature,
+                source_hash,
+                flags,
+                self.analyzer_args(),
+                self.ctu.index_hash if self.ctu else "")
+            cached = self.cache.get(key)
+            if cached is not None:
+                with open(plist_path, "w") as f:
+                    f.write(cached["plist"])
+                cached["cached"] = True
+                return cached
+        if os.path.exists(plist_path):
+            os.remove(plist_path)
+        command = [self.args.clang] + flags + ["--analyze", "-Xclang", "-analyzer-output=plist-multi-file",
+                                               "-o", plist_path] + self.analyzer_args() + [entry["file"]]
+        returncode, output = run_command(command, entry["directory"])
+        plist = ""
+        if os.path.exists(plist_path):
+            with open(plist_path, "r") as f:
+                plist = f.read()
+        result = {
+            "returncode": returncode,
+            "output": output,
+            "plist": plist
+        }
+        # NOTE: do not cache crashes and failures to run clang
+        if key and returncode == 0:
+            self.cache.put(key, result)
+        result["cached"] = False
+        return result
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Runs clang static analyzer over compile_commands.json in parallel")
+    parser.add_argument("-p", dest="build_path", default=".",
+                        help="path to compile_commands.json or build dir")
+    parser.add_argument("--clang", default=os.getenv("CC", "clang"),
+                        help="defaults to CC env. var.")
+    parser.add_argument("--extdef-mapping", default=os.getenv("CLANG_EXTDEF_MAPPING_PATH", "clang-extdef-mapping"),
+                        help="defaults to CLANG_EXTDEF_MAPPING_PATH env. var.")
+    parser.add_argument("-j", "--jobs", type=int, default=compile_db.default_jobs())
+    parser.add_argument("--output-dir", default=None,
+                        help="plist per translation unit, defaults to analyzer-results in build dir")
+    parser.add_argument("--ctu", action="store_true",
+                        help="cross translation unit analysis")
+    parser.add_argument("--ctu-dir", default=None,
+                        help="AST files and index, defaults to .clang-analyzer-ctu in build dir")
+    parser.add_argument("--cache-dir", default=None,
+                        help="defaults to .clang-analyzer-cache in build dir")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--files", default=None,
+                        help="regex to filter files from compile_commands.json")
+    parser.add_argument("analyzer_args", nargs=argparse.REMAINDER,
+                        help="passed to clang i.e. `-- -Xanalyzer -analyzer-checker=alpha.core`")
+    args = parser.parse_args(argv)
+    if args.analyzer_args and args.analyzer_args[0] == "--":
+        args.analyzer_args = args.analyzer_args[1:]
+
+    build_path = os.path.dirname(compile_db.find_compile_db(args.build_path))
+    args.build_path = build_path
+    if args.output_dir is None:
+        args.output_dir = os.path.join(build_path, "analyzer-results")
+    if args.ctu_dir is None:
+        args.ctu_dir = os.path.join(build_path, ".clang-analyzer-ctu")
+    if args.cache_dir is None:
+        args.cache_dir = os.path.join(build_path, ".clang-analyzer-cache")
+    if not os.path.exists(args.output_dir):
+        os.makedirs(args.output_dir)
+
+    entries = compile_db.load_compile_db(build_path, args.files)
+    runner = ClangAnalyzerRunner(args)
+
+    source_hashes = {}
+    for entry, source_hash in compile_db.run_parallel(runner.source_hash, entries, args.jobs):
+        source_hashes[entry["file"]] = source_hash
+
+    if runner.ctu:
+        runner.ctu.build(entries, source_hashes)
+
+    failed = 0
+    cached = 0
+    reported = set()
+    items = [(entry, source_hashes[entry["file"]]) for entry in entries]
+    for (entry, _), result in compile_db.run_parallel(runner.run, items, args.jobs):
+        if result["cached"]:
+            cached += 1
+        if result["returncode"] != 0:
+            failed += 1
+            sys.stderr.write(result["output"])
+        # header diagnostics are reported by each TU that includes header
+        for diagnostic in plist_diagnostics(result["plist"]):
+            if diagnostic not in reported:
+                reported.add(diagnostic)
+                sys.stdout.write(diagnostic + "\n")
+
+    sys.stderr.write("clang analyzer: {} files, {} from cache, {} failed, {} diagnostics\n".format(
+        len(entries), cached, failed, len(reported)))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# Runs clang-tidy over `compile_commands.json` in parallel.
+#
+# Results are cached per translation unit, cache key depends on
+# preprocessed source (so changes in any included header invalidate result),
+# compile flags, `.clang-tidy` config and clang-tidy binary,
+# so re-runs after one-file change analyze only affected files.
+# Only runs where clang-tidy parsed translation unit are cached
+# (not compile errors or crashes).
+#
+# USAGE
+# run_clang_tidy.py -p build --header-filter="^$(pwd)/src/" --export-fixes fixes.yaml
+# clang-apply-replacements can apply fixes from `fixes.yaml`
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+import compile_db
+
+# i.e. `/path/file.h:10:3: warning: ...`
+DIAGNOSTIC_RE = re.compile(r"^(.+?):\d+:\d+: (warning|error|note|remark): ")
+
+# clang-tidy failed to parse translation unit (compile error)
+PARSE_ERROR_MARKERS = ("[clang-diagnostic-error]", "Error while processing ")
+
+def parsed_translation_unit(returncode, output):
+    return returncode >= 0 and not any(marker in output for marker in PARSE_ERROR_MARKERS)
+
+# Splits clang-tidy output into diagnostics,
+# each diagnostic starts with `file:line:col: warning:` and includes notes.
+def split_diagnostics(output):
+    diagnostics = []
+    current = []
+    for line in output.splitlines():
+        match = DIAGNOSTIC_RE.match(line)
+        if match and match.group(2) != "note" and current:
+            diagnostics.append("\n".join(current))
+            current = []
+        if match or current:
+            current.append(line)
+    if current:
+        diagnostics.append("\n".join(current))
+    return diagnostics
+
+# Returns list of `- DiagnosticName: ...` blocks from exported fixes
+def split_fixes(fixes_yaml):
+    blocks = []
+    current = None
+    in_diagnostics = False
+    for line in fixes_yaml.splitlines():
+        if line.startswith("Diagnostics:"):
+            in_diagnostics = True
+            continue
+        if not in_diagnostics:
+            continue
+        if line.startswith("..."):
+            break
+        if line.startswith("  - "):
+            if current:
+                blocks.append("\n".join(current))
+            current = [line]
+        elif current is not None:
+            current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+def merge_fixes(blocks, output):
+    with open(output, "w") as f:
+        f.write("---\n")
+        f.write("MainSourceFile:  ''\n")
+        if blocks:
+            f.write("Diagnostics:\n")
+            f.write("\n".join(blocks))
+            f.write("\n")
+        else:
+            f.write("Diagnostics:     []\n")
+        f.write("...\n")
+
+class ClangTidyRunner(object):
+    def __init__(self, args):
+        self.args = args
+        self.build_path = os.path.dirname(compile_db.find_compile_db(args.build_path))
+        self.cache = compile_db.ResultCache(None if args.no_cache else args.cache_dir)
+        self.tool_signature = compile_db.tool_signature(args.clang_tidy)
+
+    def command(self, entry, fixes_path):
+        command = [self.args.clang_tidy, "-p", self.build_path]
+        if self.args.checks:
+            command.append("-checks={}".format(self.args.checks))
+        if self.args.header_filter is not None:
+            command.append("-header-filter={}".format(self.args.header_filter))
+        if fixes_path:
+            command.append("-export-fixes={}".format(fixes_path))
+        command.extend("-extra-arg={}".format(arg) for arg in self.args.extra_arg)
+        if self.args.quiet:
+            command.append("-quiet")
+        command.append(entry["file"])
+        return command
+
+    # Returns None if source can not be preprocessed (result is not cached)
+    def cache_key(self, entry):
+        source_hash = compile_db.preprocessed_hash(entry, compile_db.compile_flags(entry))
+        if not source_hash:
+            return None
+        config = compile_db.find_config(os.path.dirname(entry["file"]), ".clang-tidy")
+        config_hash = compile_db.hash_file(config) if config else ""
+        return compile_db.hash_parts(
+            "clang-tidy",
+            self.tool_signature,
+            source_hash,
+            entry["arguments"],
+            config_hash,
+            self.args.checks or "",
+            self.args.header_filter or "",
+            self.args.extra_arg)
+
+    def run(self, entry):
+        key = self.cache_key(entry)
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            cached["cached"] = True
+            return cached
+        fixes_yaml = ""
+        fd, fixes_path = tempfile.mkstemp(suffix=".yaml")
+        os.close(fd)
+        try:
+            process = subprocess.Popen(self.command(entry, fixes_path),
+                                       stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                       universal_newlines=True)
+            output, _ = process.communicate()
+            if os.path.getsize(fixes_path):
+                with open(fixes_path, "r") as f:
+                    fixes_yaml = f.read()
+        finally:
+            os.remove(fixes_path)
+        result = {
+            "returncode": process.returncode,
+            "output": output,
+            "fixes": fixes_yaml
+        }
+        # NOTE: do not cache crashes and compile errors
+        if key and parsed_translation_unit(process.returncode, output):
+            self.cache.put(key, result)
+        result["cached"] = False
+        return result
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Runs clang-tidy over compile_commands.json in parallel")
+    parser.add_argument("-p", dest="build_path", default=".",
+                        help="path to compile_commands.json or build dir")
+    parser.add_argument("--clang-tidy", default=os.getenv("CLANG_TIDY_PATH", "clang-tidy"),
+                        help="defaults to CLANG_TIDY_PATH env. var.")
+    parser.add_argument("-j", "--jobs", type=int, default=compile_db.default_jobs())
+    parser.add_argument("--checks", default=None)
+    parser.add_argument("--header-filter", default=None,
+                        help="headers matching regex are analyzed, each header diagnostic is reported once")
+    parser.add_argument("--extra-arg", action="append", default=[])
+    parser.add_argument("--export-fixes", default=None,
+                        help="merged fixes from all files, see clang-apply-replacements")
+    parser.add_argument("--cache-dir", default=None,
+                        help="defaults to .clang-tidy-cache in build dir")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--quiet", action="store_true")
+    parser.add_argument("files", nargs="?", default=None,
+                        help="regex to filter files from compile_commands.json")
+    args = parser.parse_args(argv)
+
+    build_path = os.path.dirname(compile_db.find_compile_db(args.build_path))
+    if args.cache_dir is None:
+        args.cache_dir = os.path.join(build_path, ".clang-tidy-cache")
+
+    entries = compile_db.load_compile_db(args.build_path, args.files)
+    runner = ClangTidyRunner(args)
+
+    failed = 0
+    cached = 0
+    reported = set()
+    fixes = []
+    seen_fixes = set()
+    for entry, result in compile_db.run_parallel(runner.run, entries, args.jobs):
+        if result["cached"]:
+            cached += 1
+        if result["returncode"] != 0:
+            failed += 1
+        # header diagnostics are reported by each TU that includes header
+        for diagnostic in split_diagnostics(result["output"]):
+            if diagnostic not in reported:
+                reported.add(diagnostic)
+                sys.stdout.write(diagnostic + "\n")
+        for block in split_fixes(result["fixes"]):
+            if block not in seen_fixes:
+                seen_fixes.add(block)
+                fixes.append(block)
+
+    if args.export_fixes:
+        merge_fixes(fixes, args.export_fixes)
+
+    sys.stderr.write("clang-tidy: {} files, {} from cache, {} failed, {} diagnostics\n".format(
+        len(entries), cached, failed, len(reported)))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
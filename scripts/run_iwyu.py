@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# Runs include-what-you-use over `compile_commands.json` in parallel.
+#
+# Results are cached per translation unit, cache key depends on
+# preprocessed source (so changes in any included header invalidate result),
+# compile flags, IWYU options and IWYU binary.
+#
+# USAGE
+# run_iwyu.py -p build --output iwyu.out -- -Xiwyu --mapping_file=my.imp
+# fix_includes.py < iwyu.out
+import argparse
+import os
+import subprocess
+import sys
+
+import compile_db
+
+# IWYU prints block per analyzed file (source and associated headers),
+# each block ends with `---`
+def split_blocks(output):
+    blocks = []
+    current = []
+    for line in output.splitlines():
+        current.append(line)
+        if line.strip() == "---":
+            blocks.append("\n".join(current))
+            current = []
+    if current and any(line.strip() for line in current):
+        blocks.append("\n".join(current))
+    return blocks
+
+class IwyuRunner(object):
+    def __init__(self, args):
+        self.args = args
+        self.cache = compile_db.ResultCache(None if args.no_cache else args.cache_dir)
+        self.tool_signature = compile_db.tool_signature(args.iwyu)
+        self.mapping_hashes = [compile_db.hash_file(path)
+                               for path in self.mapping_files(args.iwyu_args)]
+
+    # Content of mapping files (`.imp`) affects results
+    @staticmethod
+    def mapping_files(iwyu_args):
+        files = []
+        for arg in iwyu_args:
+            if arg.startswith("--mapping_file="):
+                path = arg[len("--mapping_file="):]
+                if os.path.isfile(path):
+                    files.append(path)
+        return files
+
+    def run(self, entry):
+        flags = compile_db.compile_flags(entry)
+        source_hash = compile_db.preprocessed_hash(entry, flags)
+        key = None
+        if source_hash:
+            key = compile_db.hash_parts(
+                "iwyu",
+                self.tool_signature,
+                source_hash,
+                flags,
+                self.args.iwyu_args,
+                self.mapping_hashes)
+            cached = self.cache.get(key)
+            if cached is not None:
+                cached["cached"] = True
+                return cached
+        command = [self.args.iwyu] + flags + self.args.iwyu_args + [entry["file"]]
+        process = subprocess.Popen(command, cwd=entry["directory"],
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   universal_newlines=True)
+        output, _ = process.communicate()
+        # NOTE: IWYU exit code is not zero even on success, see `--error` option of IWYU
+        result = {
+            "returncode": process.returncode,
+            "output": output
+        }
+        if key and process.returncode >= 0:
+            self.cache.put(key, result)
+        result["cached"] = False
+        return result
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Runs include-what-you-use over compile_commands.json in parallel")
+    parser.add_argument("-p", dest="build_path", default=".",
+                        help="path to compile_commands.json or build dir")
+    parser.add_argument("--iwyu", default=os.getenv("IWYU_PATH", "include-what-you-use"),
+                        help="defaults to IWYU_PATH env. var.")
+    parser.add_argument("-j", "--jobs", type=int, default=compile_db.default_jobs())
+    parser.add_argument("--output", default=None,
+                        help="aggregated report, can be passed to fix_includes.py")
+    parser.add_argument("--cache-dir", default=None,
+                        help="defaults to .iwyu-cache in build dir")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--files", default=None,
+                        help="regex to filter files from compile_commands.json")
+    parser.add_argument("iwyu_args", nargs=argparse.REMAINDER,
+                        help="passed to include-what-you-use i.e. `-- -Xiwyu --mapping_file=my.imp`")
+    args = parser.parse_args(argv)
+    if args.iwyu_args and args.iwyu_args[0] == "--":
+        args.iwyu_args = args.iwyu_args[1:]
+
+    build_path = os.path.dirname(compile_db.find_compile_db(args.build_path))
+    if args.cache_dir is None:
+        args.cache_dir = os.path.join(build_path, ".iwyu-cache")
+
+    entries = compile_db.load_compile_db(args.build_path, args.files)
+    runner = IwyuRunner(args)
+
+    cached = 0
+    results = {}
+    for entry, result in compile_db.run_parallel(runner.run, entries, args.jobs):
+        if result["cached"]:
+            cached += 1
+        results[entry["file"]] = result
+
+    # stable order, each block (i.e. associated header) reported once
+    blocks = []
+    seen = set()
+    for source in sorted(results.keys()):
+        for block in split_blocks(results[source]["output"]):
+            if block not in seen:
+                seen.add(block)
+                blocks.append(block)
+    report = "\n".join(blocks) + ("\n" if blocks else "")
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        sys.stdout.write(report)
+
+    sys.stderr.write("include-what-you-use: {} files, {} from cache\n".format(
+        len(entries), cached))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# Symbolizes sanitizer reports collected with `symbolize=0`
+# (see `-o llvm_9_installer:sanitizer_symbolize=offline`).
+#
+# Online symbolization spawns `llvm-symbolizer` inside each failing process,
+# here all logs are symbolized in one batch: one persistent `llvm-symbolizer`
+# per binary (binaries in parallel), each address is symbolized once.
+# Results are cached per binary, cache key depends on binary and llvm-symbolizer.
+#
+# USAGE
+# build with `-o llvm_9_installer:sanitizer_symbolize=offline`, run tests, than
+# symbolize_sanitizer_logs.py --create-log-dir  # before tests, sanitizer runtime does not create it
+# symbolize_sanitizer_logs.py                # logs from SANITIZER_LOG_DIR env. var.
+# symbolize_sanitizer_logs.py logs/asan.1234 --stdout
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+import compile_db
+
+# i.e. `    #3 0x4f5e1a  (/path/to/binary+0x4f5e1a)` or `... (BuildId: 1b2c...)`
+FRAME_RE = re.compile(r"^(\s*)#(\d+)\s+(0x[0-9a-fA-F]+)\s+\((.+?)\+(0x[0-9a-fA-F]+)\)(.*)$")
+
+SYMBOLIZED_SUFFIX = ".symbolized"
+
+def find_logs(paths):
+    logs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                candidate = os.path.join(path, name)
+                if os.path.isfile(candidate) and not name.endswith(SYMBOLIZED_SUFFIX):
+                    logs.append(candidate)
+        elif os.path.isfile(path):
+            logs.append(path)
+        else:
+            raise Exception("Unable to find path: {}".format(path))
+    return logs
+
+# Returns `{binary: set of offsets}` from all logs
+def collect_addresses(logs):
+    addresses = {}
+    for log in logs:
+        with open(log, "r", errors="replace") as f:
+            for line in f:
+                match = FRAME_RE.match(line.rstrip("\n"))
+                if match:
+                    addresses.setdefault(match.group(4), set()).add(match.group(5))
+    return addresses
+
+# Persistent `llvm-symbolizer` process for one binary,
+# addresses are passed one by one through stdin.
+class BinarySymbolizer(object):
+    def __init__(self, symbolizer, binary):
+        self.process = subprocess.Popen(
+            [symbolizer, "--obj={}".format(binary), "--inlining", "--demangle"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            universal_newlines=True, bufsize=1)
+
+    # Returns list of `[function, location]`, more than one if inlined.
+    # Output of each address is `function\nfile:line:column\n` pairs and empty line.
+    def symbolize(self, offset):
+        self.process.stdin.write(offset + "\n")
+        self.process.stdin.flush()
+        lines = []
+        while True:
+            line = self.process.stdout.readline()
+            if not line or not line.strip():
+                break
+            lines.append(line.strip())
+        frames = []
+        for index in range(0, len(lines) - 1, 2):
+            if lines[index] != "??" or not lines[index + 1].startswith("??"):
+                frames.append([lines[index], lines[index + 1]])
+        return frames
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+class LogSymbolizer(object):
+    def __init__(self, args):
+        self.args = args
+        self.cache = compile_db.ResultCache(None if args.no_cache else args.cache_dir)
+        self.tool_signature = compile_db.tool_signature(args.symbolizer)
+
+    def cache_key(self, binary):
+        return compile_db.hash_parts(
+            "llvm-symbolizer",
+            self.tool_signature,
+            compile_db.tool_signature(binary))
+
+    # Symbolizes all `offsets` of `binary`, returns `{offset: frames}`
+    def run(self, item):
+        binary, offsets = item
+        if not os.path.isfile(binary):
+            return {}
+        key = self.cache_key(binary)
+        frames = self.cache.get(key) or {}
+        missing = sorted(offset for offset in offsets if offset not in frames)
+        if missing:
+            symbolizer = BinarySymbolizer(self.args.symbolizer, binary)
+            try:
+                for offset in missing:
+                    frames[offset] = symbolizer.symbolize(offset)
+            finally:
+                symbolizer.close()
+            self.cache.put(key, frames)
+        return frames
+
+# Same format as online symbolization i.e. `#0 0x4f5e1a in main /src/a.cpp:10:3`,
+# inlined frames get their own numbers, so frames are re-numbered.
+def symbolize_log(log, frames):
+    output = []
+    index = 0
+    with open(log, "r", errors="replace") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            match = FRAME_RE.match(line)
+            if not match:
+                output.append(line)
+                continue
+            indent, number, address, binary, offset, rest = match.groups()
+            # new stack trace
+            if number == "0":
+                index = 0
+            symbols = frames.get(binary, {}).get(offset)
+            if not symbols:
+                output.append("{}#{} {} ({}+{}){}".format(indent, index, address, binary, offset, rest))
+                index += 1
+                continue
+            for function, location in symbols:
+                output.append("{}#{} {} in {} {}".format(indent, index, address, function, location))
+                index += 1
+    return "\n".join(output) + "\n"
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Symbolizes sanitizer logs collected with symbolize=0")
+    parser.add_argument("logs", nargs="*",
+                        help="log files or dirs, defaults to SANITIZER_LOG_DIR env. var.")
+    parser.add_argument("--symbolizer", default=os.getenv("SYMBOLIZER", "llvm-symbolizer"),
+                        help="defaults to SYMBOLIZER env. var.")
+    parser.add_argument("-j", "--jobs", type=int, default=compile_db.default_jobs())
+    parser.add_argument("--stdout", action="store_true",
+                        help="print symbolized logs instead of writing `<log>{}`".format(SYMBOLIZED_SUFFIX))
+    parser.add_argument("--cache-dir", default=None,
+                        help="defaults to ~/.cache/llvm_9_installer/symbolizer")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--create-log-dir", action="store_true",
+                        help="create SANITIZER_LOG_DIR (used by log_path in ASAN_OPTIONS, etc.) and exit")
+    args = parser.parse_args(argv)
+
+    if args.create_log_dir:
+        log_dir = os.getenv("SANITIZER_LOG_DIR")
+        if not log_dir:
+            parser.error("SANITIZER_LOG_DIR env. var. is required")
+        if not os.path.exists(log_dir):
+            os.makedirs(log_dir, exist_ok=True)
+        print(log_dir)
+        return 0
+
+    paths = args.logs or ([os.getenv("SANITIZER_LOG_DIR")] if os.getenv("SANITIZER_LOG_DIR") else [])
+    if not paths:
+        parser.error("logs are required (or SANITIZER_LOG_DIR env. var.)")
+    if args.cache_dir is None:
+        args.cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "llvm_9_installer", "symbolizer")
+
+    logs = find_logs(paths)
+    addresses = collect_addresses(logs)
+    runner = LogSymbolizer(args)
+    frames = {}
+    for (binary, _), result in compile_db.run_parallel(runner.run, sorted(addresses.items()), args.jobs):
+        frames[binary] = result
+
+    for log in logs:
+        symbolized = symbolize_log(log, frames)
+        if args.stdout:
+            sys.stdout.write(symbolized)
+        else:
+            with open(log + SYMBOLIZED_SUFFIX, "w") as f:
+                f.write(symbolized)
+
+    sys.stderr.write("symbolizer: {} logs, {} binaries, {} addresses\n".format(
+        len(logs), len(addresses), sum(len(offsets) for offsets in addresses.values())))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# Aggregates `-ftime-trace` results of all translation units in build dir.
+#
+# Reports most expensive translation units, headers (inclusive parse time)
+# and template instantiations.
+#
+# USAGE
+# build with `-o llvm_9_installer:time_trace=True`, than
+# time_trace_report.py build --top 20
+# time_trace_report.py build --json report.json
+import argparse
+import json
+import os
+import sys
+
+# Names of trace events, see `llvm::TimeTraceScope` usage in clang
+TU_EVENTS = ["ExecuteCompiler", "Total ExecuteCompiler"]
+HEADER_EVENTS = ["Source"]
+TEMPLATE_EVENTS = ["InstantiateClass", "InstantiateFunction"]
+
+class Stat(object):
+    def __init__(self):
+        self.total_us = 0
+        self.count = 0
+
+    def add(self, duration_us):
+        self.total_us += duration_us
+        self.count += 1
+
+    def to_dict(self, name):
+        return {"name": name, "total_ms": self.total_us / 1000.0, "count": self.count}
+
+def find_traces(build_dir):
+    for root, dirs, files in os.walk(build_dir):
+        for name in files:
+            # trace is stored near object file i.e. `CMakeFiles/x.dir/a.cpp.json`
+            if name.endswith(".json") and name != "compile_commands.json":
+                yield os.path.join(root, name)
+
+def load_trace(path):
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or "traceEvents" not in data:
+        return None
+    return data["traceEvents"]
+
+def aggregate(build_dir):
+    units = {}
+    headers = {}
+    templates = {}
+    for path in find_traces(build_dir):
+        events = load_trace(path)
+        if events is None:
+            continue
+        unit_us = 0
+        for event in events:
+            if event.get("ph") != "X":
+                continue
+            name = event.get("name")
+            duration = event.get("dur", 0)
+            detail = event.get("args", {}).get("detail")
+            if name in TU_EVENTS:
+                unit_us = max(unit_us, duration)
+            elif name in HEADER_EVENTS and detail:
+                headers.setdefault(detail, Stat()).add(duration)
+            elif name in TEMPLATE_EVENTS and detail:
+                templates.setdefault(detail, Stat()).add(duration)
+        # trace file name is object file name with `.json` extension
+        unit = units.setdefault(path[:-len(".json")], Stat())
+        unit.add(unit_us)
+    return units, headers, templates
+
+def top(stats, count):
+    ordered = sorted(stats.items(), key=lambda item: item[1].total_us, reverse=True)
+    return [stat.to_dict(name) for name, stat in ordered[:count]]
+
+def print_table(title, rows):
+    sys.stdout.write("\n**** {}:\n".format(title))
+    for row in rows:
+        sys.stdout.write("{:>10.0f} ms {:>6}x  {}\n".format(row["total_ms"], row["count"], row["name"]))
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Aggregates clang -ftime-trace results")
+    parser.add_argument("build_dir", nargs="?", default=".")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", dest="json_output", default=None,
+                        help="write report as json")
+    args = parser.parse_args(argv)
+
+    units, headers, templates = aggregate(args.build_dir)
+    if not units:
+        sys.stderr.write("No -ftime-trace results found in {}\n".format(args.build_dir))
+        return 1
+
+    report = {
+        "translation_units": top(units, args.top),
+        "headers": top(headers, args.top),
+        "templates": top(templates, args.top),
+        "total_ms": sum(stat.total_us for stat in units.values()) / 1000.0,
+        "translation_unit_count": len(units)
+    }
+
+    if args.json_output:
+        with open(args.json_output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    sys.stdout.write("{} translation units, {:.0f} ms total\n".format(
+        report["translation_unit_count"], report["total_ms"]))
+    print_table("Most expensive translation units", report["translation_units"])
+    print_table("Most expensive headers (inclusive)", report["headers"])
+    print_table("Most expensive template instantiations", report["templates"])
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
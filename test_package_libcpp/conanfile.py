@@ -19,7 +19,18 @@ class TestPackageConan(ConanFile):
         cmake.configure()
         cmake.build()
 
+    # flags are passed to each compiler and linker invocation,
+    # so same flag must not be added twice
+    def _check_flags_unique(self):
+        installer = self.deps_cpp_info[get_name("llvm_9_installer")]
+        for name in ["cxxflags", "cflags", "sharedlinkflags", "exelinkflags"]:
+          flags = getattr(installer, name)
+          duplicates = sorted(set([flag for flag in flags if flags.count(flag) > 1]))
+          if duplicates:
+            raise Exception("Duplicate {}: {}".format(name, " ".join(duplicates)))
+
     def test(self):
+        self._check_flags_unique()
         with tools.environment_append(RunEnvironment(self).vars):
           #print("environ ",os.environ)
           bin_path = os.path.join("bin", "test_package")
@@ -23,4 +23,9 @@ class TestPackageConan(ConanFile):
         with tools.environment_append(RunEnvironment(self).vars):
           #print("environ ",os.environ)
           bin_path = os.path.join("bin", "test_package")
-          self.run(command=bin_path, run_environment=True)
+          # set if `llvm_9_installer:sanitizer_preload=test`
+          sanitizer_env = {}
+          if os.getenv("SANITIZER_PRELOAD_PATH"):
+            sanitizer_env["LD_PRELOAD"] = os.getenv("SANITIZER_PRELOAD_PATH")
+          with tools.environment_append(sanitizer_env):
+            self.run(command=bin_path, run_environment=True)